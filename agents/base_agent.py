@@ -1,15 +1,25 @@
 """Base agent class for the multi-agent system."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Info lines buffered by the agent call running in the current task. Agents
+# are shared by concurrent requests, so the buffer cannot live on the agent.
+_log_buffer: ContextVar[Optional[List[str]]] = ContextVar("agent_log_buffer", default=None)
 
-class AgentState(BaseModel):
-    """State model for agent communication."""
+
+@dataclass(slots=True)
+class AgentState:
+    """State model for agent communication.
+    
+    A plain slotted dataclass: the state only travels between in-process
+    agents, so per-assignment validation is unnecessary.
+    """
     user_query: str
     sql_query: Optional[str] = None
     validation_result: Optional[Dict[str, Any]] = None
@@ -17,6 +27,8 @@ class AgentState(BaseModel):
     formatted_result: Optional[str] = None
     error_message: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
+    # Set by the validator: the SQL passed validation and no error occurred
+    can_execute: bool = False
 
 
 class BaseAgent(ABC):
@@ -32,11 +44,24 @@ class BaseAgent(ABC):
         pass
     
     def log_info(self, message: str):
-        """Log info message."""
-        self.logger.info(f"[{self.name}] {message}")
+        """Buffer info message until the current call flushes."""
+        buffered = _log_buffer.get()
+        if buffered is None:
+            buffered = []
+            _log_buffer.set(buffered)
+        buffered.append(f"[{self.name}] {message}")
+    
+    def flush_logs(self):
+        """Emit the current call's buffered info messages as a single log record."""
+        buffered = _log_buffer.get()
+        if not buffered:
+            return
+        _log_buffer.set(None)
+        self.logger.info("\n".join(buffered))
     
     def log_error(self, message: str, error: Exception = None):
         """Log error message."""
+        self.flush_logs()
         if error:
             self.logger.error(f"[{self.name}] {message}: {error}")
         else:
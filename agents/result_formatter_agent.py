@@ -1,11 +1,14 @@
 """Result formatting agent."""
 
-import pandas as pd
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, TYPE_CHECKING
 from datetime import datetime
 
 from agents.base_agent import BaseAgent, AgentState
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class ResultFormatterAgent(BaseAgent):
     """Agent responsible for formatting query results for display."""
@@ -25,7 +28,9 @@ class ResultFormatterAgent(BaseAgent):
             if not state.execution_result.get("success", False):
                 state.formatted_result = self._format_error_result(state.execution_result)
             else:
-                state.formatted_result = self._format_success_result(state.execution_result)
+                state.formatted_result = await asyncio.to_thread(
+                    self._format_success_result, state.execution_result
+                )
             
             self.log_info("Results formatted successfully")
             
@@ -33,48 +38,57 @@ class ResultFormatterAgent(BaseAgent):
             self.log_error("Result formatting error", e)
             state.error_message = f"Result formatting error: {str(e)}"
             state.formatted_result = f"Error formatting results: {str(e)}"
+        finally:
+            self.flush_logs()
         
         return state
     
     def _format_success_result(self, execution_result: Dict[str, Any]) -> str:
         """Format successful query results."""
-        data = execution_result.get("data", [])
         columns = execution_result.get("columns", [])
         row_count = execution_result.get("row_count", 0)
         truncated = execution_result.get("truncated", False)
         
-        if not data:
+        # Executor results carry the columnar DataFrame; records are only
+        # materialized for the rows that are actually displayed
+        df = execution_result.get("_df")
+        data = execution_result.get("data", []) if df is None else None
+        total_rows = len(df) if df is not None else len(data)
+        
+        if total_rows == 0:
             return "✅ Query executed successfully, but no results were found."
         
-        # Create formatted output
-        result_lines = []
-        result_lines.append("✅ **Query Results:**")
-        result_lines.append("")
+        # Tiny results skip pandas entirely; statistics on a few rows say nothing
+        if total_rows <= 3:
+            records = data if df is None else df.to_dict('records')
+            return self._format_tiny(records, columns or list(records[0]), row_count, truncated)
         
-        # Add summary information
-        result_lines.append(f"📊 **Summary:** {row_count} row(s) returned")
-        if truncated:
-            result_lines.append(f"⚠️ **Note:** Results truncated to first 1000 rows")
-        result_lines.append("")
+        if df is None:
+            import pandas as pd
+            df = pd.DataFrame(data)
+        
+        columns = columns or df.columns.tolist()
+        
+        # Create formatted output
+        result_lines = self._summary_lines(row_count, truncated)
         
         # Format data as table
-        if len(data) <= 20:  # Show full table for small results
-            table_str = self._create_table(data, columns)
+        if len(df) <= 20:  # Show full table for small results
+            table_str = self._create_table(df.to_dict('records'), columns)
             result_lines.append("📋 **Data:**")
             result_lines.append("```")
             result_lines.append(table_str)
             result_lines.append("```")
         else:  # Show sample for large results
-            sample_data = data[:10]
-            table_str = self._create_table(sample_data, columns)
+            table_str = self._create_table(df.head(10).to_dict('records'), columns)
             result_lines.append("📋 **Sample Data (first 10 rows):**")
             result_lines.append("```")
             result_lines.append(table_str)
             result_lines.append("```")
-            result_lines.append(f"... and {len(data) - 10} more rows")
+            result_lines.append(f"... and {len(df) - 10} more rows")
         
         # Add statistics if available
-        stats = self._calculate_basic_stats(data, columns)
+        stats = self._calculate_basic_stats(df)
         if stats:
             result_lines.append("")
             result_lines.append("📈 **Statistics:**")
@@ -83,6 +97,25 @@ class ResultFormatterAgent(BaseAgent):
         
         return "\n".join(result_lines)
     
+    def _summary_lines(self, row_count: int, truncated: bool) -> List[str]:
+        """Build the header and summary lines shared by all result formats."""
+        result_lines = []
+        result_lines.append("✅ **Query Results:**")
+        result_lines.append("")
+        
+        # Add summary information
+        result_lines.append(f"📊 **Summary:** {row_count} row(s) returned")
+        if truncated:
+            result_lines.append(f"⚠️ **Note:** Results truncated to first 1000 rows")
+        result_lines.append("")
+        return result_lines
+    
+    def _format_tiny(self, data: List[Dict], columns: List[str], row_count: int, truncated: bool) -> str:
+        """Format a result of at most a few rows without pandas or statistics."""
+        result_lines = self._summary_lines(row_count, truncated)
+        result_lines.extend(["📋 **Data:**", "```", self._create_table(data, columns), "```"])
+        return "\n".join(result_lines)
+    
     def _format_error_result(self, execution_result: Dict[str, Any]) -> str:
         """Format error results."""
         error_msg = execution_result.get("error", "Unknown error")
@@ -93,38 +126,43 @@ class ResultFormatterAgent(BaseAgent):
         if not data or not columns:
             return "No data to display"
         
-        # Convert to DataFrame for better formatting
-        df = pd.DataFrame(data)
+        # Small tables are laid out directly, without building a DataFrame
+        if len(data) <= 20 and len(columns) <= 10:
+            cells = [[str(row.get(col, '')) for col in columns] for row in data]
+            widths = [
+                max(len(col), *(len(row[i]) for row in cells))
+                for i, col in enumerate(columns)
+            ]
+            lines = [" | ".join(col.ljust(width) for col, width in zip(columns, widths))]
+            lines.append("-+-".join("-" * width for width in widths))
+            lines.extend(
+                " | ".join(cell.ljust(width) for cell, width in zip(row, widths))
+                for row in cells
+            )
+            return "\n".join(lines)
         
-        # Format the table
-        return df.to_string(index=False, max_rows=20, max_cols=10)
+        # Fall back to pandas for wide tables
+        import pandas as pd
+        return pd.DataFrame(data).to_string(index=False, max_rows=20, max_cols=10)
     
-    def _calculate_basic_stats(self, data: List[Dict], columns: List[str]) -> List[str]:
+    def _calculate_basic_stats(self, df: "pd.DataFrame") -> List[str]:
         """Calculate basic statistics for the data."""
-        if not data:
+        if df.empty:
             return []
         
         stats = []
-        df = pd.DataFrame(data)
-        
-        # Numeric column statistics
-        numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
-        if numeric_columns:
-            for col in numeric_columns[:3]:  # Limit to first 3 numeric columns
-                try:
-                    col_stats = df[col].describe()
-                    stats.append(f"{col}: avg={col_stats['mean']:.2f}, min={col_stats['min']:.2f}, max={col_stats['max']:.2f}")
-                except:
-                    continue
-        
-        # Categorical column statistics
-        categorical_columns = df.select_dtypes(include=['object']).columns.tolist()
-        if categorical_columns:
-            for col in categorical_columns[:2]:  # Limit to first 2 categorical columns
-                try:
-                    unique_count = df[col].nunique()
-                    stats.append(f"{col}: {unique_count} unique values")
-                except:
-                    continue
+        
+        # Numeric column statistics (limit to first 3 numeric columns)
+        num_df = df.select_dtypes(include=['number']).iloc[:, :3]
+        if not num_df.empty:
+            desc = num_df.agg(['mean', 'min', 'max']).to_dict()
+            for col, col_stats in desc.items():
+                stats.append(f"{col}: avg={col_stats['mean']:.2f}, min={col_stats['min']:.2f}, max={col_stats['max']:.2f}")
+        
+        # Categorical column statistics (limit to first 2 categorical columns)
+        cat_df = df.select_dtypes(include=['object', 'string']).iloc[:, :2]
+        if not cat_df.empty:
+            for col, unique_count in cat_df.nunique().items():
+                stats.append(f"{col}: {unique_count} unique values")
         
         return stats
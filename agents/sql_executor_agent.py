@@ -1,11 +1,12 @@
 """SQL query execution agent."""
 
+import asyncio
 import pandas as pd
 from typing import Dict, Any, List
 from sqlalchemy.exc import SQLAlchemyError
 
 from agents.base_agent import BaseAgent, AgentState
-from database.connection import db_manager
+from database.connection import get_db_manager
 
 
 class SQLExecutorAgent(BaseAgent):
@@ -29,11 +30,11 @@ class SQLExecutorAgent(BaseAgent):
                 return state
             
             # Execute the query
-            execution_result = self._execute_query(state.sql_query)
+            execution_result = await asyncio.to_thread(self._execute_query, state.sql_query)
             state.execution_result = execution_result
             
             if execution_result.get("success", False):
-                self.log_info(f"Query executed successfully. Rows returned: {len(execution_result.get('data', []))}")
+                self.log_info(f"Query executed successfully. Rows returned: {execution_result.get('row_count', 0)}")
             else:
                 state.error_message = f"Query execution failed: {execution_result.get('error', 'Unknown error')}"
                 self.log_error(f"Execution failed: {execution_result.get('error', 'Unknown error')}")
@@ -42,15 +43,23 @@ class SQLExecutorAgent(BaseAgent):
             self.log_error("SQL execution error", e)
             state.error_message = f"SQL execution error: {str(e)}"
             state.execution_result = {"success": False, "error": str(e)}
+        finally:
+            self.flush_logs()
         
         return state
     
     def _execute_query(self, sql_query: str) -> Dict[str, Any]:
         """Execute SQL query and return results."""
         try:
-            with db_manager.get_session() as session:
-                # Execute query using pandas for better data handling
-                df = pd.read_sql_query(sql_query, session.bind)
+            with get_db_manager().get_readonly_connection() as connection:
+                # Execute query using pandas for better data handling. Only the
+                # first chunk is fetched so oversized results are never
+                # materialized; one extra row tells us whether to truncate.
+                chunks = pd.read_sql_query(sql_query, connection, chunksize=self.max_rows + 1)
+                try:
+                    df = next(chunks)
+                finally:
+                    chunks.close()
                 
                 # Limit result size
                 if len(df) > self.max_rows:
@@ -59,17 +68,15 @@ class SQLExecutorAgent(BaseAgent):
                 else:
                     truncated = False
                 
-                # Convert to dictionary format
-                data = df.to_dict('records')
-                columns = df.columns.tolist()
-                
+                # Keep the columnar DataFrame rather than a dict per row;
+                # consumers convert only the rows they actually need
                 return {
                     "success": True,
-                    "data": data,
-                    "columns": columns,
-                    "row_count": len(data),
+                    "columns": df.columns.tolist(),
+                    "row_count": len(df),
                     "truncated": truncated,
-                    "query": sql_query
+                    "query": sql_query,
+                    "_df": df
                 }
                 
         except SQLAlchemyError as e:
@@ -90,29 +97,32 @@ class SQLExecutorAgent(BaseAgent):
         if not execution_result.get("success", False):
             return {"error": "Query failed"}
         
-        data = execution_result.get("data", [])
+        df = execution_result.get("_df")
+        if df is None:
+            df = pd.DataFrame(execution_result.get("data", []))
         columns = execution_result.get("columns", [])
         
         stats = {
-            "total_rows": len(data),
+            "total_rows": len(df),
             "total_columns": len(columns),
             "column_names": columns,
             "truncated": execution_result.get("truncated", False)
         }
         
         # Add basic statistics for numeric columns
-        if data:
-            df = pd.DataFrame(data)
+        if not df.empty:
             numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
             
             if numeric_columns:
-                stats["numeric_summary"] = {}
-                for col in numeric_columns:
-                    stats["numeric_summary"][col] = {
-                        "min": float(df[col].min()),
-                        "max": float(df[col].max()),
-                        "mean": float(df[col].mean()),
-                        "count": int(df[col].count())
+                agg = df[numeric_columns].agg(['min', 'max', 'mean', 'count'])
+                stats["numeric_summary"] = {
+                    col: {
+                        "min": float(agg.at['min', col]),
+                        "max": float(agg.at['max', col]),
+                        "mean": float(agg.at['mean', col]),
+                        "count": int(agg.at['count', col])
                     }
+                    for col in numeric_columns
+                }
         
         return stats
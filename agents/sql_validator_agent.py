@@ -1,17 +1,30 @@
 """SQL query validation agent."""
 
+import asyncio
 import sqlparse
 from sqlparse import sql, tokens
-from typing import Dict, Any, List
+from typing import Dict, Any
+from itertools import chain
 import re
 
 from agents.base_agent import BaseAgent, AgentState
-from database.connection import db_manager
 
 
 class SQLValidatorAgent(BaseAgent):
     """Agent responsible for validating SQL queries."""
     
+    # The injection regex is compiled once at class load rather than on every query
+    _INJECTION_PATTERNS = {
+        "comment": r"';.*--",  # Comment injection
+        "union": r"\bunion\b.*select",  # Union-based injection
+        "or_true": r"\bor\b.*1\s*=\s*1",  # Boolean-based injection
+        "and_true": r"\band\b.*1\s*=\s*1",  # Boolean-based injection
+    }
+    _INJECTION_RE = re.compile(
+        "|".join(f"(?P<{name}>{pattern})" for name, pattern in _INJECTION_PATTERNS.items()),
+        re.IGNORECASE | re.DOTALL  # Patterns may span line breaks
+    )
+    
     def __init__(self):
         super().__init__("SQLValidatorAgent")
         self.allowed_keywords = {
@@ -24,12 +37,13 @@ class SQLValidatorAgent(BaseAgent):
             'DROP', 'DELETE', 'UPDATE', 'INSERT', 'CREATE', 'ALTER', 'TRUNCATE',
             'EXEC', 'EXECUTE', 'UNION', 'GRANT', 'REVOKE'
         }
-        self.valid_tables = {
+        self.valid_tables = frozenset({
             'stores', 'customers', 'products', 'orders', 'order_items'
-        }
+        })
     
     async def process(self, state: AgentState) -> AgentState:
         """Validate the SQL query."""
+        state.can_execute = False
         try:
             self.log_info(f"Validating SQL: {state.sql_query}")
             
@@ -37,19 +51,22 @@ class SQLValidatorAgent(BaseAgent):
                 state.error_message = "No SQL query to validate"
                 return state
             
-            validation_result = self._validate_query(state.sql_query)
+            validation_result = await asyncio.to_thread(self._validate_query, state.sql_query)
             state.validation_result = validation_result
             
             if not validation_result["is_valid"]:
                 state.error_message = f"SQL validation failed: {validation_result['error']}"
                 self.log_error(f"Validation failed: {validation_result['error']}")
             else:
+                state.can_execute = not state.error_message
                 self.log_info("SQL query validation passed")
             
         except Exception as e:
             self.log_error("SQL validation error", e)
             state.error_message = f"SQL validation error: {str(e)}"
             state.validation_result = {"is_valid": False, "error": str(e)}
+        finally:
+            self.flush_logs()
         
         return state
     
@@ -63,27 +80,55 @@ class SQLValidatorAgent(BaseAgent):
             
             statement = parsed[0]
             
-            # Check for forbidden keywords
-            forbidden_found = self._check_forbidden_keywords(sql_query)
-            if forbidden_found:
-                return {
-                    "is_valid": False,
-                    "error": f"Forbidden keyword found: {forbidden_found}"
-                }
+            # Single pass over the tokens of every statement: check the
+            # statement type, flag forbidden keywords and collect table names
+            first_dml = None
+            expect_table = False
+            tables_found = set()
+            for token in chain.from_iterable(stmt.flatten() for stmt in parsed):
+                if token.is_whitespace or token.ttype in tokens.Comment:
+                    continue
+                
+                if expect_table:
+                    expect_table = False
+                    if token.ttype in tokens.Name:
+                        tables_found.add(token.value.lower())
+                        continue
+                
+                if not token.is_keyword:
+                    continue
+                
+                keyword = token.normalized
+                if first_dml is None and token.ttype is tokens.Keyword.DML:
+                    first_dml = keyword
+                    if keyword != 'SELECT':
+                        return {
+                            "is_valid": False,
+                            "error": "Only SELECT statements are allowed"
+                        }
+                
+                if keyword in self.forbidden_keywords:
+                    return {
+                        "is_valid": False,
+                        "error": f"Forbidden keyword found: {keyword}"
+                    }
+                
+                if keyword == 'FROM' or keyword.endswith('JOIN'):
+                    expect_table = True
             
             # Check if it's a SELECT statement
-            if not self._is_select_statement(statement):
+            if first_dml is None:
                 return {
                     "is_valid": False,
                     "error": "Only SELECT statements are allowed"
                 }
             
             # Validate table names
-            invalid_tables = self._validate_table_names(sql_query)
+            invalid_tables = tables_found - self.valid_tables
             if invalid_tables:
                 return {
                     "is_valid": False,
-                    "error": f"Invalid table names: {', '.join(invalid_tables)}"
+                    "error": f"Invalid table names: {', '.join(sorted(invalid_tables))}"
                 }
             
             # Check for SQL injection patterns
@@ -97,57 +142,15 @@ class SQLValidatorAgent(BaseAgent):
             return {
                 "is_valid": True,
                 "parsed_query": statement,
-                "tables_used": self._extract_table_names(sql_query)
+                "tables_used": list(tables_found)
             }
             
         except Exception as e:
             return {"is_valid": False, "error": f"Validation error: {str(e)}"}
     
-    def _check_forbidden_keywords(self, sql_query: str) -> str:
-        """Check for forbidden SQL keywords."""
-        query_upper = sql_query.upper()
-        for keyword in self.forbidden_keywords:
-            if re.search(r'\b' + keyword + r'\b', query_upper):
-                return keyword
-        return None
-    
-    def _is_select_statement(self, statement) -> bool:
-        """Check if the statement is a SELECT statement."""
-        for token in statement.flatten():
-            if token.ttype is tokens.Keyword.DML:
-                return token.value.upper() == 'SELECT'
-        return False
-    
-    def _validate_table_names(self, sql_query: str) -> List[str]:
-        """Validate that all table names exist in the schema."""
-        table_names = self._extract_table_names(sql_query)
-        invalid_tables = []
-        
-        for table in table_names:
-            if table.lower() not in self.valid_tables:
-                invalid_tables.append(table)
-        
-        return invalid_tables
-    
-    def _extract_table_names(self, sql_query: str) -> List[str]:
-        """Extract table names from SQL query."""
-        # Simple regex-based extraction (could be improved with proper parsing)
-        pattern = r'\b(?:FROM|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        matches = re.findall(pattern, sql_query, re.IGNORECASE)
-        return list(set(matches))
-    
     def _check_sql_injection(self, sql_query: str) -> str:
         """Check for common SQL injection patterns."""
-        injection_patterns = [
-            r"';.*--",  # Comment injection
-            r"union.*select",  # Union-based injection
-            r"or.*1=1",  # Boolean-based injection
-            r"and.*1=1",  # Boolean-based injection
-        ]
-        
-        query_lower = sql_query.lower()
-        for pattern in injection_patterns:
-            if re.search(pattern, query_lower):
-                return f"Pattern: {pattern}"
-        
+        match = self._INJECTION_RE.search(sql_query)
+        if match:
+            return f"Pattern: {self._INJECTION_PATTERNS[match.lastgroup]}"
         return None
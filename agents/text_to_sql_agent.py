@@ -1,17 +1,22 @@
 """Text-to-SQL conversion agent."""
 
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Tuple
+import hashlib
+import re
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
 
 from agents.base_agent import BaseAgent, AgentState
 from config.settings import settings
-from database.connection import db_manager
+from database.connection import get_db_manager
 
 
 class TextToSQLAgent(BaseAgent):
     """Agent responsible for converting natural language to SQL queries."""
     
+    # Markdown code fences and "SQL:"/"Query:" line prefixes the LLM might add
+    _CLEAN_RE = re.compile(r'```(?:sql)?|^\s*(?:SQL|Query):', re.IGNORECASE | re.MULTILINE)
+    
     def __init__(self):
         super().__init__("TextToSQLAgent")
         self.llm = ChatGroq(
@@ -21,9 +26,16 @@ class TextToSQLAgent(BaseAgent):
             temperature=0.1
         )
         self.prompt_template = self._create_prompt_template()
+        # LRU cache of generated SQL keyed by normalized query and prompt inputs
+        self.cache_size = 512
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
     
-    def _create_prompt_template(self) -> PromptTemplate:
-        """Create prompt template for text-to-SQL conversion."""
+    def _create_prompt_template(self) -> str:
+        """Create prompt template for text-to-SQL conversion.
+        
+        The template is fixed, so it is kept as a plain string and filled in
+        with str.format instead of going through LangChain's PromptTemplate.
+        """
         template = """
         You are an expert SQL query generator for a retail database.
         
@@ -47,10 +59,7 @@ class TextToSQLAgent(BaseAgent):
         SQL Query:
         """
         
-        return PromptTemplate(
-            input_variables=["schema_info", "context", "user_query"],
-            template=template
-        )
+        return template
     
     async def process(self, state: AgentState) -> AgentState:
         """Convert natural language query to SQL."""
@@ -58,16 +67,27 @@ class TextToSQLAgent(BaseAgent):
             self.log_info(f"Converting query: {state.user_query}")
             
             # Get database schema information
-            schema_info = db_manager.get_schema_info()
+            schema_info = get_db_manager().get_schema_info()
             
             # Prepare context from previous interactions
             context = ""
             if state.context and "previous_queries" in state.context:
                 recent_queries = state.context["previous_queries"][-3:]  # Last 3 queries
-                context = "\n".join([
+                # Skip repeats of the current question; they add tokens, not context
+                context = "\n".join(
                     f"Previous Query: {q['user_query']} -> SQL: {q['sql_query']}"
                     for q in recent_queries
-                ])
+                    if q['user_query'] != state.user_query
+                )
+            
+            # Reuse SQL generated earlier for the same question and inputs
+            cache_key = self._cache_key(state.user_query, schema_info, context)
+            cached_sql = self._cache.get(cache_key)
+            if cached_sql is not None:
+                self._cache.move_to_end(cache_key)
+                state.sql_query = cached_sql
+                self.log_info(f"Using cached SQL: {cached_sql}")
+                return state
             
             # Generate SQL query
             prompt = self.prompt_template.format(
@@ -83,19 +103,35 @@ class TextToSQLAgent(BaseAgent):
             sql_query = self._clean_sql_query(sql_query)
             
             state.sql_query = sql_query
+            self._cache[cache_key] = sql_query
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
             self.log_info(f"Generated SQL: {sql_query}")
             
         except Exception as e:
             self.log_error("Failed to convert text to SQL", e)
             state.error_message = f"Text-to-SQL conversion failed: {str(e)}"
+        finally:
+            self.flush_logs()
         
         return state
     
+    def _cache_key(self, user_query: str, schema_info: str, context: str) -> Tuple[str, str]:
+        """Build the SQL cache key for a query and its prompt inputs."""
+        normalized_query = " ".join(user_query.lower().split())
+        inputs_hash = hashlib.blake2b(
+            f"{schema_info}\0{context}".encode(), digest_size=8
+        ).hexdigest()
+        return normalized_query, inputs_hash
+    
+    def clear_cache(self) -> None:
+        """Drop all cached SQL conversions."""
+        self._cache.clear()
+    
     def _clean_sql_query(self, sql_query: str) -> str:
         """Clean and format the generated SQL query."""
         # Remove common prefixes/suffixes that LLM might add
-        sql_query = sql_query.replace("```sql", "").replace("```", "")
-        sql_query = sql_query.replace("SQL:", "").replace("Query:", "")
+        sql_query = self._CLEAN_RE.sub("", sql_query)
         
         # Remove extra whitespace and ensure proper formatting
         sql_query = " ".join(sql_query.split())
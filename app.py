@@ -2,15 +2,20 @@
 
 import streamlit as st
 import asyncio
+import html
 import logging
+import threading
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+from typing import TYPE_CHECKING
 
-from core.workflow import TextToSQLWorkflow
+from core.context_manager import ContextManager
 from config.settings import settings
-from scripts.seed_database import seed_database
+
+# The workflow pulls in LangGraph, the agents and the Groq client, and seeding
+# pulls in SQLAlchemy; both are imported where they are first used so the
+# page can paint before them
+if TYPE_CHECKING:
+    from core.workflow import TextToSQLWorkflow
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +29,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Example questions offered in the chat tab
+EXAMPLE_QUERIES = (
+    "Show me all stores and their managers",
+    "What are the top 5 best-selling products?",
+    "List customers who have placed orders in the last 30 days",
+    "Show total revenue by store",
+    "Which products are out of stock?",
+    "Show me orders with status 'shipped'",
+    "What's the average order value?",
+    "List all electronics products under $200"
+)
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -66,80 +83,132 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def get_workflow() -> "TextToSQLWorkflow":
+    """Build the agent workflow once per process and share it across sessions."""
+    from core.workflow import TextToSQLWorkflow
+    return TextToSQLWorkflow()
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Start one background event loop per process for running the workflow.
+    
+    Reusing a single loop keeps the LLM client's HTTP connections alive
+    between queries instead of tearing them down with each asyncio.run.
+    """
+    try:
+        import uvloop
+        loop = uvloop.new_event_loop()
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    
+    threading.Thread(target=loop.run_forever, name="workflow-loop", daemon=True).start()
+    return loop
+
+
+def iterate_on_loop(async_iterator):
+    """Iterate an async iterator on the background loop from the script thread."""
+    loop = get_event_loop()
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(async_iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
 def initialize_session_state():
     """Initialize Streamlit session state."""
-    if "workflow" not in st.session_state:
-        st.session_state.workflow = TextToSQLWorkflow()
+    # Conversation context is per session; the cached workflow is shared
+    if "context_manager" not in st.session_state:
+        st.session_state.context_manager = ContextManager()
     
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
-    
-    if "database_seeded" not in st.session_state:
-        st.session_state.database_seeded = False
+
+
+@st.cache_resource(show_spinner="Initializing database with sample data...")
+def _seed_once() -> bool:
+    """Seed the database once per process rather than once per session."""
+    from scripts.seed_database import seed_database
+    seed_database()
+    return True
 
 
 def seed_database_if_needed():
     """Seed database if not already done."""
-    if not st.session_state.database_seeded:
-        with st.spinner("Initializing database with sample data..."):
-            try:
-                seed_database()
-                st.session_state.database_seeded = True
-                st.success("Database initialized successfully!")
-            except Exception as e:
-                st.error(f"Failed to initialize database: {e}")
+    try:
+        _seed_once()
+    except Exception as e:
+        st.error(f"Failed to initialize database: {e}")
 
 
 def display_chat_history():
-    """Display chat history."""
-    for i, entry in enumerate(st.session_state.chat_history):
+    """Display chat history.
+    
+    All messages are emitted as one markdown element; only the SQL expanders
+    are rendered as separate widgets. Formatted results are markdown of their
+    own, so they sit outside the HTML blocks and are not escaped.
+    """
+    parts = []
+    for entry in st.session_state.chat_history:
         # User message
-        st.markdown(f"""
-        <div class="chat-message user-message">
-            <strong>You:</strong> {entry['user_query']}
-        </div>
-        """, unsafe_allow_html=True)
+        parts.append(f"""
+<div class="chat-message user-message">
+    <strong>You:</strong> {html.escape(entry['user_query'])}
+</div>
+""")
         
         # Assistant response
         if entry['success']:
-            st.markdown(f"""
-            <div class="chat-message assistant-message">
-                <strong>Assistant:</strong><br>
-                {entry['formatted_result']}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Show SQL query in expander
-            if entry['sql_query']:
-                with st.expander(f"View SQL Query #{i+1}"):
-                    st.code(entry['sql_query'], language='sql')
+            parts.append(f"""
+<div class="chat-message assistant-message">
+    <strong>Assistant:</strong>
+</div>
+
+{entry['formatted_result'] or ''}
+""")
         else:
-            st.markdown(f"""
-            <div class="chat-message error-message">
-                <strong>Error:</strong> {entry['error_message']}
-            </div>
-            """, unsafe_allow_html=True)
+            parts.append(f"""
+<div class="chat-message error-message">
+    <strong>Error:</strong> {html.escape(entry['error_message'] or '')}
+</div>
+""")
+    
+    if parts:
+        st.markdown("\n".join(parts), unsafe_allow_html=True)
+    
+    # Show SQL queries in expanders
+    for i, entry in enumerate(st.session_state.chat_history):
+        if entry['success'] and entry['sql_query']:
+            with st.expander(f"View SQL Query #{i+1}"):
+                st.code(entry['sql_query'], language='sql')
 
 
+@st.fragment
 def display_context_info():
-    """Display context information in sidebar."""
-    context_manager = st.session_state.workflow.get_context_manager()
+    """Display context information in sidebar.
+    
+    Must be called inside ``with st.sidebar:``; fragments can only write to
+    their own container.
+    """
+    context_manager = st.session_state.context_manager
     context_summary = context_manager.get_context_summary()
     
-    st.sidebar.markdown("### 📊 Context Information")
+    st.markdown("### 📊 Context Information")
     
     # Context usage
     usage_percentage = (context_summary['context_window_usage'] / 
                        context_summary['context_window_size']) * 100
     
-    st.sidebar.metric(
+    st.metric(
         "Context Usage",
         f"{context_summary['context_window_usage']}/{context_summary['context_window_size']}",
         f"{usage_percentage:.1f}%"
     )
     
     # Query statistics
-    col1, col2 = st.sidebar.columns(2)
+    col1, col2 = st.columns(2)
     with col1:
         st.metric("Successful", context_summary['successful_queries'])
     with col2:
@@ -148,19 +217,19 @@ def display_context_info():
     # Token usage
     token_percentage = (context_summary['token_usage'] / 
                        context_summary['max_tokens']) * 100
-    st.sidebar.metric(
+    st.metric(
         "Token Usage",
         f"{context_summary['token_usage']}/{context_summary['max_tokens']}",
         f"{token_percentage:.1f}%"
     )
     
     # Context warning
-    warning = context_manager.get_context_warning()
+    warning = context_manager.get_context_warning(context_summary)
     if warning:
-        st.sidebar.warning(warning)
+        st.warning(warning)
     
     # Clear context button
-    if st.sidebar.button("🗑️ Clear Context"):
+    if st.button("🗑️ Clear Context"):
         context_manager.clear_context()
         st.session_state.chat_history = []
         st.rerun()
@@ -185,55 +254,66 @@ def display_database_schema():
         """)
 
 
+@st.fragment
 def display_analytics():
     """Display analytics dashboard."""
     st.markdown("### 📈 Query Analytics")
     
-    if not st.session_state.chat_history:
+    history = st.session_state.chat_history
+    if not history:
         st.info("No queries executed yet. Start chatting to see analytics!")
         return
     
-    # Prepare data
-    history_df = pd.DataFrame([
-        {
-            'timestamp': datetime.now(),  # In real app, store actual timestamps
-            'success': entry['success'],
-            'query_length': len(entry['user_query']),
-            'has_sql': bool(entry.get('sql_query'))
-        }
-        for entry in st.session_state.chat_history
-    ])
+    # One pass over the session history; no DataFrame needed for three numbers
+    total_queries = len(history)
+    successful_queries = sum(1 for entry in history if entry['success'])
+    query_length_sum = sum(len(entry['user_query']) for entry in history)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        success_rate = (history_df['success'].sum() / len(history_df)) * 100
-        st.metric("Success Rate", f"{success_rate:.1f}%")
+        st.metric("Success Rate", f"{successful_queries / total_queries * 100:.1f}%")
     
     with col2:
-        avg_query_length = history_df['query_length'].mean()
-        st.metric("Avg Query Length", f"{avg_query_length:.0f} chars")
+        st.metric("Avg Query Length", f"{query_length_sum / total_queries:.0f} chars")
     
     with col3:
-        total_queries = len(history_df)
         st.metric("Total Queries", total_queries)
     
     # Success/Failure chart
-    if len(history_df) > 1:
-        success_counts = history_df['success'].value_counts()
-        fig = px.pie(
-            values=success_counts.values,
-            names=['Failed' if not x else 'Successful' for x in success_counts.index],
-            title="Query Success Rate"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    if total_queries > 1:
+        st.markdown("**Query Success Rate**")
+        st.bar_chart({"Queries": {
+            "Successful": successful_queries,
+            "Failed": total_queries - successful_queries
+        }})
 
 
-async def process_user_query(user_query: str):
-    """Process user query through the workflow."""
+def process_user_query(user_query: str):
+    """Process user query through the workflow.
+    
+    The workflow runs on the shared background loop; Streamlit calls stay on
+    the script thread. Progress is shown as each stage completes, so the
+    generated SQL appears while the query is still executing.
+    """
     try:
-        with st.spinner("Processing your query..."):
-            result = await st.session_state.workflow.process_query(user_query)
+        result = None
+        with st.status("Generating SQL...") as status:
+            updates = get_workflow().stream_query(
+                user_query, st.session_state.context_manager
+            )
+            for update in iterate_on_loop(updates):
+                stage = update.pop("stage")
+                if stage == "complete":
+                    result = update
+                    status.update(label="Done", state="complete" if update["success"] else "error")
+                elif stage == "sql_generated" and update["sql_query"]:
+                    st.code(update["sql_query"], language='sql')
+                    status.update(label="Validating SQL...")
+                elif stage == "validated":
+                    status.update(label="Executing query...")
+                elif stage == "executed":
+                    status.update(label="Formatting results...")
             
             # Add to chat history
             st.session_state.chat_history.append(result)
@@ -252,11 +332,81 @@ async def process_user_query(user_query: str):
         return error_result
 
 
+@st.fragment
+def display_chat():
+    """Display the chat interface.
+    
+    Runs as a fragment so typing in the input only repaints this tab. Actions
+    that change the history rerun the whole app so the sidebar and analytics
+    stay current.
+    """
+    # Chat interface
+    st.markdown("### Ask questions about the retail database in natural language!")
+    
+    # Example queries
+    with st.expander("💡 Example Queries"):
+        for i, example in enumerate(EXAMPLE_QUERIES):
+            if st.button(example, key=f"example_{i}"):
+                # Process example query
+                result = process_user_query(example)
+                st.rerun()
+    
+    # Chat input
+    user_query = st.text_input(
+        "Enter your question:",
+        placeholder="e.g., Show me the top 10 customers by total order value",
+        key="user_input"
+    )
+    
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        submit_button = st.button("🚀 Submit", type="primary")
+    with col2:
+        if st.button("🗑️ Clear Chat"):
+            st.session_state.chat_history = []
+            st.rerun()
+    
+    # Process query
+    if submit_button and user_query:
+        result = process_user_query(user_query)
+        st.rerun()
+    
+    # Display chat history
+    if st.session_state.chat_history:
+        st.markdown("---")
+        display_chat_history()
+
+
+@st.fragment
+def display_settings():
+    """Display configuration and history export."""
+    st.markdown("### ⚙️ Configuration")
+    
+    # Display current settings
+    st.markdown("**Current Settings:**")
+    st.json({
+        "Model": settings.model_name,
+        "Max Tokens": settings.max_tokens,
+        "Context Window Size": settings.context_window_size,
+        "Database URL": settings.database_url
+    })
+    
+    # Export conversation history
+    if st.button("📥 Export Conversation History"):
+        context_manager = st.session_state.context_manager
+        history_json = context_manager.export_history(compact=True)
+        st.download_button(
+            label="Download History",
+            data=history_json,
+            file_name=f"conversation_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+
+
 def main():
     """Main application function."""
     # Initialize
     initialize_session_state()
-    seed_database_if_needed()
     
     # Header
     st.markdown('<h1 class="main-header">🤖 Text-to-SQL Conversational Chatbot</h1>', 
@@ -266,85 +416,24 @@ def main():
     
     # Sidebar
     st.sidebar.title("🛠️ Controls")
-    display_context_info()
+    with st.sidebar:
+        display_context_info()
     display_database_schema()
     
+    # Seed after the header and sidebar so they paint while SQLAlchemy loads
+    seed_database_if_needed()
+    
     # Main content tabs
     tab1, tab2, tab3 = st.tabs(["💬 Chat", "📈 Analytics", "⚙️ Settings"])
     
     with tab1:
-        # Chat interface
-        st.markdown("### Ask questions about the retail database in natural language!")
-        
-        # Example queries
-        with st.expander("💡 Example Queries"):
-            examples = [
-                "Show me all stores and their managers",
-                "What are the top 5 best-selling products?",
-                "List customers who have placed orders in the last 30 days",
-                "Show total revenue by store",
-                "Which products are out of stock?",
-                "Show me orders with status 'shipped'",
-                "What's the average order value?",
-                "List all electronics products under $200"
-            ]
-            
-            for example in examples:
-                if st.button(example, key=f"example_{hash(example)}"):
-                    # Process example query
-                    result = asyncio.run(process_user_query(example))
-                    st.rerun()
-        
-        # Chat input
-        user_query = st.text_input(
-            "Enter your question:",
-            placeholder="e.g., Show me the top 10 customers by total order value",
-            key="user_input"
-        )
-        
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            submit_button = st.button("🚀 Submit", type="primary")
-        with col2:
-            if st.button("🗑️ Clear Chat"):
-                st.session_state.chat_history = []
-                st.rerun()
-        
-        # Process query
-        if submit_button and user_query:
-            result = asyncio.run(process_user_query(user_query))
-            st.rerun()
-        
-        # Display chat history
-        if st.session_state.chat_history:
-            st.markdown("---")
-            display_chat_history()
+        display_chat()
     
     with tab2:
         display_analytics()
     
     with tab3:
-        st.markdown("### ⚙️ Configuration")
-        
-        # Display current settings
-        st.markdown("**Current Settings:**")
-        st.json({
-            "Model": settings.model_name,
-            "Max Tokens": settings.max_tokens,
-            "Context Window Size": settings.context_window_size,
-            "Database URL": settings.database_url
-        })
-        
-        # Export conversation history
-        if st.button("📥 Export Conversation History"):
-            context_manager = st.session_state.workflow.get_context_manager()
-            history_json = context_manager.export_history()
-            st.download_button(
-                label="Download History",
-                data=history_json,
-                file_name=f"conversation_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
-            )
+        display_settings()
 
 
 if __name__ == "__main__":
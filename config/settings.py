@@ -1,36 +1,38 @@
 """Configuration settings for the Text-to-SQL chatbot."""
 
 import os
-from typing import Optional
-#from pydantic import BaseSettings, Field
-from pydantic_settings import BaseSettings
-from pydantic import Field
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
+from pathlib import Path
 
-load_dotenv()
+# python-dotenv is only needed when there is a .env file to read
+if Path(".env").exists():
+    from dotenv import load_dotenv
+    load_dotenv()
 
 
-class Settings(BaseSettings):
+def _env(name: str, default: str) -> str:
+    """Read an environment variable, falling back to a default."""
+    return os.environ.get(name, default)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
     """Application settings."""
     
     # API Configuration
-    groq_api_key: str = Field(..., env="GROQ_API_KEY")
-    model_name: str = Field(default="mixtral-8x7b-32768", env="MODEL_NAME")
-    max_tokens: int = Field(default=4000, env="MAX_TOKENS")
+    groq_api_key: str = field(default_factory=lambda: os.environ["GROQ_API_KEY"])
+    model_name: str = field(default_factory=lambda: _env("MODEL_NAME", "mixtral-8x7b-32768"))
+    max_tokens: int = field(default_factory=lambda: int(_env("MAX_TOKENS", "4000")))
     
     # Database Configuration
-    database_url: str = Field(default="sqlite:///retail_database.db", env="DATABASE_URL")
+    database_url: str = field(default_factory=lambda: _env("DATABASE_URL", "sqlite:///retail_database.db"))
     
     # Context Management
-    context_window_size: int = Field(default=10, env="CONTEXT_WINDOW_SIZE")
+    context_window_size: int = field(default_factory=lambda: int(_env("CONTEXT_WINDOW_SIZE", "10")))
     
     # Application Configuration
     app_title: str = "Text-to-SQL Conversational Chatbot"
     app_description: str = "AI-powered chatbot for querying retail database using natural language"
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
 
 
 # Global settings instance
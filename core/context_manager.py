@@ -1,8 +1,10 @@
 """Context management for conversation history."""
 
-from typing import Dict, Any, List, Optional
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Any, Iterable, Optional
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 import json
 
 from config.settings import settings
@@ -24,9 +26,15 @@ class ContextManager:
     
     def __init__(self, max_entries: int = None):
         self.max_entries = max_entries or settings.context_window_size
-        self.conversation_history: List[ConversationEntry] = []
+        # Bounded deque: appending past max_entries evicts the oldest entry
+        self.conversation_history: Deque[ConversationEntry] = deque(maxlen=self.max_entries)
         self.total_tokens = 0
         self.max_tokens = settings.max_tokens
+        # Running counts kept in step with the history, so summaries are O(1)
+        self._success_count = 0
+        self._fail_count = 0
+        # LLM context built from the current history; reset on every mutation
+        self._llm_context_cache: Optional[Dict[str, Any]] = None
     
     def add_entry(self, 
                   user_query: str,
@@ -43,34 +51,65 @@ class ContextManager:
             result_summary=result_summary,
             token_count=token_count
         )
-        
-        self.conversation_history.append(entry)
-        self.total_tokens += token_count
+        self._append(entry)
         
         # Maintain context window size
         self._maintain_context_window()
     
-    def _maintain_context_window(self) -> None:
-        """Maintain the context window size and token limits."""
-        # Remove old entries if exceeding max entries
-        while len(self.conversation_history) > self.max_entries:
-            removed_entry = self.conversation_history.pop(0)
-            self.total_tokens -= removed_entry.token_count
+    def bulk_add_entries(self, entries: Iterable[ConversationEntry]) -> None:
+        """Add several existing entries, such as persisted history, in order.
         
+        The token limit is enforced once after all entries are appended.
+        """
+        for entry in entries:
+            self._append(entry)
+        
+        self._maintain_context_window()
+    
+    def _append(self, entry: ConversationEntry) -> None:
+        """Append an entry and update the running totals."""
+        # Account for the entry the deque is about to evict
+        if len(self.conversation_history) == self.max_entries:
+            self._discount(self.conversation_history[0])
+        
+        self.conversation_history.append(entry)
+        self._llm_context_cache = None
+        self.total_tokens += entry.token_count
+        if entry.success:
+            self._success_count += 1
+        else:
+            self._fail_count += 1
+    
+    def _maintain_context_window(self) -> None:
+        """Maintain the token limits; the deque already caps the entry count."""
         # Remove old entries if exceeding token limit
         while (self.total_tokens > self.max_tokens * 0.8 and 
                len(self.conversation_history) > 1):
-            removed_entry = self.conversation_history.pop(0)
-            self.total_tokens -= removed_entry.token_count
+            self._discount(self.conversation_history.popleft())
+    
+    def _discount(self, entry: ConversationEntry) -> None:
+        """Remove an evicted entry from the running totals."""
+        self.total_tokens -= entry.token_count
+        if entry.success:
+            self._success_count -= 1
+        else:
+            self._fail_count -= 1
     
     def get_context_for_llm(self) -> Dict[str, Any]:
-        """Get context formatted for LLM consumption."""
+        """Get context formatted for LLM consumption.
+        
+        The result is cached until the history changes and must not be mutated.
+        """
+        if self._llm_context_cache is not None:
+            return self._llm_context_cache
+        
         if not self.conversation_history:
             return {"previous_queries": []}
         
         # Get recent successful queries for context
         recent_queries = []
-        for entry in self.conversation_history[-5:]:  # Last 5 entries
+        start = max(len(self.conversation_history) - 5, 0)
+        for entry in islice(self.conversation_history, start, None):  # Last 5 entries
             if entry.success and entry.sql_query:
                 recent_queries.append({
                     "user_query": entry.user_query,
@@ -78,21 +117,19 @@ class ContextManager:
                     "timestamp": entry.timestamp.isoformat()
                 })
         
-        return {
+        self._llm_context_cache = {
             "previous_queries": recent_queries,
             "total_conversations": len(self.conversation_history),
             "context_window_usage": f"{len(self.conversation_history)}/{self.max_entries}"
         }
+        return self._llm_context_cache
     
     def get_context_summary(self) -> Dict[str, Any]:
         """Get summary of current context state."""
-        successful_queries = sum(1 for entry in self.conversation_history if entry.success)
-        failed_queries = len(self.conversation_history) - successful_queries
-        
         return {
             "total_conversations": len(self.conversation_history),
-            "successful_queries": successful_queries,
-            "failed_queries": failed_queries,
+            "successful_queries": self._success_count,
+            "failed_queries": self._fail_count,
             "context_window_size": self.max_entries,
             "context_window_usage": len(self.conversation_history),
             "token_usage": self.total_tokens,
@@ -104,21 +141,40 @@ class ContextManager:
     def clear_context(self) -> None:
         """Clear all conversation history."""
         self.conversation_history.clear()
+        self._llm_context_cache = None
         self.total_tokens = 0
+        self._success_count = 0
+        self._fail_count = 0
     
-    def export_history(self) -> str:
-        """Export conversation history as JSON."""
-        history_data = []
-        for entry in self.conversation_history:
-            entry_dict = asdict(entry)
-            entry_dict['timestamp'] = entry.timestamp.isoformat()
-            history_data.append(entry_dict)
+    def export_history(self, compact: bool = False) -> str:
+        """Export conversation history as JSON.
         
+        ``compact`` drops the indentation for smaller machine-readable output.
+        """
+        # Entries hold only primitives, so a direct dict avoids asdict's deep copy
+        history_data = [
+            {
+                "timestamp": entry.timestamp.isoformat(),
+                "user_query": entry.user_query,
+                "sql_query": entry.sql_query,
+                "success": entry.success,
+                "result_summary": entry.result_summary,
+                "token_count": entry.token_count
+            }
+            for entry in self.conversation_history
+        ]
+        
+        if compact:
+            return json.dumps(history_data, separators=(",", ":"))
         return json.dumps(history_data, indent=2)
     
-    def get_context_warning(self) -> Optional[str]:
-        """Get warning message if context limits are being approached."""
-        summary = self.get_context_summary()
+    def get_context_warning(self, summary: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Get warning message if context limits are being approached.
+        
+        Pass a summary already fetched from get_context_summary to reuse it.
+        """
+        if summary is None:
+            summary = self.get_context_summary()
         
         warnings = []
         
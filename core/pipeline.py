@@ -0,0 +1,108 @@
+"""Asynchronous pipeline running the agents as concurrent stages.
+
+An opt-in utility for batch or multi-client callers; the LangGraph workflow
+and the Streamlit app run one query at a time and do not use it.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+
+from agents.base_agent import AgentState, BaseAgent
+
+
+def _can_execute(state: AgentState) -> bool:
+    """Determine if a validated state should continue to execution."""
+    return state.can_execute
+
+
+class AgentPipeline:
+    """Runs the agents as concurrent stages connected by bounded queues.
+    
+    Each stage has its own worker task, so LLM generation for one request
+    overlaps SQL execution and formatting of the requests submitted before it.
+    The existing agent ``process`` methods are used unchanged.
+    """
+    
+    def __init__(self,
+                 text_to_sql_agent: BaseAgent,
+                 validator_agent: BaseAgent,
+                 executor_agent: BaseAgent,
+                 formatter_agent: BaseAgent,
+                 maxsize: int = 8):
+        # Each stage pairs an agent with an optional gate deciding whether the
+        # state moves on to the next stage or completes right away
+        self.stages: List[Tuple[BaseAgent, Optional[Callable[[AgentState], bool]]]] = [
+            (text_to_sql_agent, None),
+            (validator_agent, _can_execute),
+            (executor_agent, None),
+            (formatter_agent, None),
+        ]
+        self.maxsize = maxsize
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+    
+    async def __aenter__(self) -> "AgentPipeline":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+    
+    async def start(self) -> None:
+        """Start one worker task per stage."""
+        if self._tasks:
+            return
+        
+        self._queues = [asyncio.Queue(maxsize=self.maxsize) for _ in self.stages]
+        self._tasks = [
+            asyncio.create_task(self._run_stage(index))
+            for index in range(len(self.stages))
+        ]
+    
+    async def stop(self) -> None:
+        """Cancel the stage workers and every query that has not completed."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        
+        # Queries still waiting in a queue would otherwise never resolve
+        for queue in self._queues:
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                future.cancel()
+        self._tasks = []
+        self._queues = []
+    
+    async def submit(self, user_query: str, context: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """Submit a query and return a future resolving to its final state."""
+        await self.start()
+        
+        future = asyncio.get_running_loop().create_future()
+        state = AgentState(user_query=user_query, context=context)
+        await self._queues[0].put((state, future))
+        return future
+    
+    async def _run_stage(self, index: int) -> None:
+        """Consume states from a stage queue and hand them to the next one."""
+        agent, gate = self.stages[index]
+        inbox = self._queues[index]
+        is_last = index == len(self.stages) - 1
+        
+        while True:
+            state, future = await inbox.get()
+            try:
+                state = await agent.process(state)
+                if is_last or (gate is not None and not gate(state)):
+                    if not future.done():
+                        future.set_result(state)
+                else:
+                    await self._queues[index + 1].put((state, future))
+            except asyncio.CancelledError:
+                # The pipeline is stopping with this query mid-stage
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                inbox.task_done()
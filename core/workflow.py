@@ -1,6 +1,9 @@
 """LangGraph workflow for the multi-agent system."""
 
-from typing import Dict, Any
+from functools import lru_cache
+from dataclasses import fields
+from typing import AsyncIterator, Dict, Any, Optional
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 import asyncio
 
@@ -12,6 +15,98 @@ from agents.result_formatter_agent import ResultFormatterAgent
 from core.context_manager import ContextManager
 
 
+# The graph topology is static, so it is compiled once per process. Nodes look
+# up the agents of the invoking workflow from the run config instead of
+# closing over an instance.
+
+# Progress stage reported by stream_query after each node completes
+_NODE_STAGES = {
+    "text_to_sql": "sql_generated",
+    "validate_sql": "validated",
+    "execute_sql": "executed",
+    "format_result": "formatted",
+}
+
+
+@lru_cache(maxsize=None)
+def _encoder():
+    """Load the tiktoken encoding, or None when it is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # Not installed, or the encoding file cannot be fetched
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _count_tokens(text: str) -> int:
+    """Count the tokens in a string, falling back to a word count."""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is None:
+        return len(text.split())
+    return len(encoder.encode(text))
+
+
+def _workflow_from(config: RunnableConfig) -> "TextToSQLWorkflow":
+    """Get the workflow instance the graph was invoked for."""
+    return config["configurable"]["workflow"]
+
+
+async def _text_to_sql_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """Text-to-SQL conversion node."""
+    return await _workflow_from(config).text_to_sql_agent.process(state)
+
+
+async def _validate_sql_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """SQL validation node."""
+    return await _workflow_from(config).validator_agent.process(state)
+
+
+async def _execute_sql_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """SQL execution node."""
+    return await _workflow_from(config).executor_agent.process(state)
+
+
+async def _format_result_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """Result formatting node."""
+    return await _workflow_from(config).formatter_agent.process(state)
+
+
+def _should_execute(state: AgentState) -> str:
+    """Determine if SQL should be executed based on validation."""
+    return "execute" if state.can_execute else "end"
+
+
+@lru_cache(maxsize=None)
+def _compiled_graph():
+    """Build and compile the LangGraph workflow."""
+    workflow = StateGraph(AgentState)
+    
+    # Add nodes
+    workflow.add_node("text_to_sql", _text_to_sql_node)
+    workflow.add_node("validate_sql", _validate_sql_node)
+    workflow.add_node("execute_sql", _execute_sql_node)
+    workflow.add_node("format_result", _format_result_node)
+    
+    # Add edges
+    workflow.set_entry_point("text_to_sql")
+    workflow.add_edge("text_to_sql", "validate_sql")
+    workflow.add_conditional_edges(
+        "validate_sql",
+        _should_execute,
+        {
+            "execute": "execute_sql",
+            "end": END
+        }
+    )
+    workflow.add_edge("execute_sql", "format_result")
+    workflow.add_edge("format_result", END)
+    
+    return workflow.compile()
+
+
 class TextToSQLWorkflow:
     """Multi-agent workflow for Text-to-SQL processing."""
     
@@ -23,75 +118,72 @@ class TextToSQLWorkflow:
         self.context_manager = ContextManager()
         self.workflow = self._create_workflow()
     
-    def _create_workflow(self) -> StateGraph:
-        """Create the LangGraph workflow."""
-        workflow = StateGraph(AgentState)
+    def _create_workflow(self):
+        """Get the shared compiled LangGraph workflow."""
+        return _compiled_graph()
+    
+    _should_execute = staticmethod(_should_execute)
+    
+    async def process_query(self,
+                            user_query: str,
+                            context_manager: Optional[ContextManager] = None) -> Dict[str, Any]:
+        """Process a user query through the workflow.
         
-        # Add nodes
-        workflow.add_node("text_to_sql", self._text_to_sql_node)
-        workflow.add_node("validate_sql", self._validate_sql_node)
-        workflow.add_node("execute_sql", self._execute_sql_node)
-        workflow.add_node("format_result", self._format_result_node)
+        Callers sharing one workflow across conversations pass their own
+        context manager; otherwise the workflow's default one is used.
+        """
+        if context_manager is None:
+            context_manager = self.context_manager
         
-        # Add edges
-        workflow.set_entry_point("text_to_sql")
-        workflow.add_edge("text_to_sql", "validate_sql")
-        workflow.add_conditional_edges(
-            "validate_sql",
-            self._should_execute,
-            {
-                "execute": "execute_sql",
-                "end": END
-            }
-        )
-        workflow.add_edge("execute_sql", "format_result")
-        workflow.add_edge("format_result", END)
+        response = {}
+        async for update in self.stream_query(user_query, context_manager):
+            response = update
+        response.pop("stage", None)
         
-        return workflow.compile()
-    
-    async def _text_to_sql_node(self, state: AgentState) -> AgentState:
-        """Text-to-SQL conversion node."""
-        return await self.text_to_sql_agent.process(state)
-    
-    async def _validate_sql_node(self, state: AgentState) -> AgentState:
-        """SQL validation node."""
-        return await self.validator_agent.process(state)
-    
-    async def _execute_sql_node(self, state: AgentState) -> AgentState:
-        """SQL execution node."""
-        return await self.executor_agent.process(state)
-    
-    async def _format_result_node(self, state: AgentState) -> AgentState:
-        """Result formatting node."""
-        return await self.formatter_agent.process(state)
-    
-    def _should_execute(self, state: AgentState) -> str:
-        """Determine if SQL should be executed based on validation."""
-        if (state.validation_result and 
-            state.validation_result.get("is_valid", False) and 
-            not state.error_message):
-            return "execute"
-        return "end"
+        # The stream is exhausted, so the query is recorded by now
+        response["context_summary"] = context_manager.get_context_summary()
+        response["context_warning"] = context_manager.get_context_warning(response["context_summary"])
+        return response
     
-    async def process_query(self, user_query: str) -> Dict[str, Any]:
-        """Process a user query through the workflow."""
+    async def stream_query(self,
+                           user_query: str,
+                           context_manager: Optional[ContextManager] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Process a user query, yielding progress after each workflow node.
+        
+        Intermediate updates carry the stage name ("sql_generated",
+        "validated", "executed", "formatted") plus the SQL and error so far.
+        The last update has stage "complete" and the response; the query is
+        recorded in the context manager just before it.
+        """
+        if context_manager is None:
+            context_manager = self.context_manager
+        
         try:
             # Create initial state with context
-            context = self.context_manager.get_context_for_llm()
+            context = context_manager.get_context_for_llm()
             initial_state = AgentState(
                 user_query=user_query,
                 context=context
             )
             
-            # Run the workflow
-            workflow_result = await self.workflow.ainvoke(initial_state)
+            # Run the workflow, reporting each node's result as it completes
+            values = {f.name: getattr(initial_state, f.name) for f in fields(AgentState)}
+            async for update in self.workflow.astream(
+                initial_state,
+                config={"configurable": {"workflow": self}},
+                stream_mode="updates"
+            ):
+                for node, node_values in update.items():
+                    values.update(node_values)
+                    yield {
+                        "stage": _NODE_STAGES[node],
+                        "sql_query": values["sql_query"],
+                        "error_message": values["error_message"]
+                    }
             
-            if isinstance(workflow_result, dict):
-                final_state = AgentState(**workflow_result)
-            else:
-                final_state = workflow_result
+            final_state = AgentState(**values)
             
-            # Update context manager
+            # Prepare the context manager entry
             success = (final_state.execution_result and 
                       final_state.execution_result.get("success", False))
             
@@ -102,16 +194,13 @@ class TextToSQLWorkflow:
             elif final_state.error_message:
                 result_summary = f"Error: {final_state.error_message}"
             
-            # Estimate token count (rough approximation)
-            token_count = len(user_query.split()) + len((final_state.sql_query or "").split())
-            
-            self.context_manager.add_entry(
-                user_query=user_query,
-                sql_query=final_state.sql_query,
-                success=success,
-                result_summary=result_summary,
-                token_count=token_count
-            )
+            entry = {
+                "user_query": user_query,
+                "sql_query": final_state.sql_query,
+                "success": success,
+                "result_summary": result_summary,
+                "token_count": _count_tokens(user_query) + _count_tokens(final_state.sql_query or "")
+            }
             
             # Prepare response
             response = {
@@ -119,28 +208,25 @@ class TextToSQLWorkflow:
                 "user_query": user_query,
                 "sql_query": final_state.sql_query,
                 "formatted_result": final_state.formatted_result,
-                "error_message": final_state.error_message,
-                "context_summary": self.context_manager.get_context_summary(),
-                "context_warning": self.context_manager.get_context_warning()
+                "error_message": final_state.error_message
             }
             
-            return response
-            
         except Exception as e:
             error_msg = f"Workflow error: {str(e)}"
-            self.context_manager.add_entry(
-                user_query=user_query,
-                success=False,
-                result_summary=error_msg,
-                token_count=len(user_query.split())
-            )
-            
-            return {
+            entry = {
+                "user_query": user_query,
+                "success": False,
+                "result_summary": error_msg,
+                "token_count": _count_tokens(user_query)
+            }
+            response = {
                 "success": False,
                 "user_query": user_query,
-                "error_message": error_msg,
-                "context_summary": self.context_manager.get_context_summary()
+                "error_message": error_msg
             }
+        
+        context_manager.add_entry(**entry)
+        yield {"stage": "complete", **response}
     
     def get_context_manager(self) -> ContextManager:
         """Get the context manager instance."""
@@ -1,10 +1,12 @@
 """Database connection and session management."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, create_engine, event
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 from contextlib import contextmanager
-from typing import Generator
+from functools import lru_cache
+from typing import Generator, Optional, Set
 import logging
 
 from config.settings import settings
@@ -13,35 +15,118 @@ from database.models import Base
 logger = logging.getLogger(__name__)
 
 
+def _describe_schema(metadata: MetaData) -> str:
+    """Describe the model tables in the plain-text form used in LLM prompts."""
+    lines = ["Database Schema:", ""]
+    for number, table in enumerate(metadata.tables.values(), start=1):
+        lines.append(f"{number}. {table.name} table:")
+        for column in table.columns:
+            details = [str(column.type)]
+            if column.primary_key:
+                details.append("PRIMARY KEY")
+            details.extend(f"FOREIGN KEY to {fk.target_fullname}" for fk in column.foreign_keys)
+            if column.unique:
+                details.append("UNIQUE")
+            lines.append(f"   - {column.name} ({', '.join(details)})")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# Built once from the models, so adding a model updates the prompt automatically
+_SCHEMA_INFO = _describe_schema(Base.metadata)
+
+
+# Applied to every new SQLite connection: WAL lets readers proceed while a
+# write is in progress, and the rest trade durability on power loss for speed
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Configure a freshly opened SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _set_sqlite_query_only(connection: Connection, enabled: bool) -> None:
+    """Toggle SQLite's query_only flag without starting a transaction."""
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA query_only={'ON' if enabled else 'OFF'}")
+    finally:
+        cursor.close()
+
+
 class DatabaseManager:
     """Database connection manager."""
     
-    def __init__(self, database_url: str = None):
+    # Database URLs whose tables were already created in this process
+    _initialized_urls: Set[str] = set()
+    
+    def __init__(self, database_url: str = None, engine: Optional[Engine] = None):
+        # An existing engine (and its pool) can be shared instead of building one
+        if engine is not None:
+            database_url = engine.url.render_as_string(hide_password=False)
         self.database_url = database_url or settings.database_url
-        self.engine = None
+        self.engine = engine
         self.SessionLocal = None
         self._initialize_engine()
     
+    def _create_engine(self) -> Engine:
+        """Create an engine with pooling suited to the database backend."""
+        if "sqlite" in self.database_url:
+            engine = create_engine(
+                self.database_url,
+                poolclass=StaticPool,
+                connect_args={"check_same_thread": False}
+            )
+            event.listen(engine, "connect", _apply_sqlite_pragmas)
+            return engine
+        return create_engine(
+            self.database_url,
+            poolclass=QueuePool,
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,
+            pool_recycle=3600
+        )
+    
     def _initialize_engine(self):
         """Initialize database engine and session factory."""
         try:
-            if "sqlite" in self.database_url:
-                self.engine = create_engine(
-                    self.database_url,
-                    poolclass=StaticPool,
-                    connect_args={"check_same_thread": False}
-                )
-            else:
-                self.engine = create_engine(self.database_url)
+            if self.engine is None:
+                self.engine = self._create_engine()
             
+            # Built once per manager; objects stay readable after the
+            # session commits instead of being reloaded on next access
             self.SessionLocal = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=self.engine
             )
             
-            # Create tables
-            Base.metadata.create_all(bind=self.engine)
+            # Create tables once per database; in-memory databases are new
+            # for every engine, so they always need them
+            database = self.engine.url.database
+            in_memory = not database or database == ":memory:" or "mode=memory" in self.database_url
+            if in_memory or self.database_url not in self._initialized_urls:
+                Base.metadata.create_all(bind=self.engine)
+                # create_all skips existing tables, so add indexes that
+                # databases created before they were declared are missing
+                for table in Base.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(bind=self.engine, checkfirst=True)
+                if not in_memory:
+                    self._initialized_urls.add(self.database_url)
             logger.info("Database initialized successfully")
             
         except Exception as e:
@@ -62,55 +147,33 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def get_schema_info(self) -> str:
-        """Get database schema information for LLM context."""
-        schema_info = """
-        Database Schema:
-        
-        1. stores table:
-           - id (INTEGER, PRIMARY KEY)
-           - name (VARCHAR(100))
-           - location (VARCHAR(200))
-           - manager (VARCHAR(100))
-           - phone (VARCHAR(20))
-           - email (VARCHAR(100))
-           - created_at (DATETIME)
-        
-        2. customers table:
-           - id (INTEGER, PRIMARY KEY)
-           - first_name (VARCHAR(50))
-           - last_name (VARCHAR(50))
-           - email (VARCHAR(100), UNIQUE)
-           - phone (VARCHAR(20))
-           - address (TEXT)
-           - created_at (DATETIME)
-        
-        3. products table:
-           - id (INTEGER, PRIMARY KEY)
-           - name (VARCHAR(100))
-           - category (VARCHAR(50))
-           - price (FLOAT)
-           - description (TEXT)
-           - in_stock (BOOLEAN)
-           - created_at (DATETIME)
-        
-        4. orders table:
-           - id (INTEGER, PRIMARY KEY)
-           - customer_id (INTEGER, FOREIGN KEY to customers.id)
-           - store_id (INTEGER, FOREIGN KEY to stores.id)
-           - order_date (DATETIME)
-           - total_amount (FLOAT)
-           - status (VARCHAR(20))
+    @contextmanager
+    def get_readonly_connection(self) -> Generator[Connection, None, None]:
+        """Get a pooled Core connection that rejects writes.
         
-        5. order_items table:
-           - id (INTEGER, PRIMARY KEY)
-           - order_id (INTEGER, FOREIGN KEY to orders.id)
-           - product_id (INTEGER, FOREIGN KEY to products.id)
-           - quantity (INTEGER)
-           - unit_price (FLOAT)
+        Skips the ORM session machinery and streams results where the driver
+        supports server-side cursors.
         """
-        return schema_info
+        with self.engine.connect() as connection:
+            if connection.dialect.name == "sqlite":
+                # query_only outlives the transaction, and pooled connections
+                # are shared, so it is switched back off before release
+                _set_sqlite_query_only(connection, True)
+                try:
+                    yield connection.execution_options(stream_results=True)
+                finally:
+                    connection.rollback()
+                    _set_sqlite_query_only(connection, False)
+            else:
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                yield connection.execution_options(stream_results=True)
+    
+    def get_schema_info(self) -> str:
+        """Get database schema information for LLM context."""
+        return _SCHEMA_INFO
 
 
-# Global database manager instance
-db_manager = DatabaseManager()
+@lru_cache(maxsize=None)
+def get_db_manager() -> DatabaseManager:
+    """Get the process-wide database manager, creating it on first use."""
+    return DatabaseManager()
@@ -1,6 +1,6 @@
 """Database models for retail stores and orders."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -52,6 +52,10 @@ class Product(Base):
     in_stock = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_products_category_instock", "category", "in_stock"),
+    )
+    
     # Relationships
     order_items = relationship("OrderItem", back_populates="product")
 
@@ -67,6 +71,13 @@ class Order(Base):
     total_amount = Column(Float, nullable=False)
     status = Column(String(20), default="pending")
     
+    # Indexes for the common join and date-range access paths
+    __table_args__ = (
+        Index("ix_orders_customer_date", "customer_id", order_date.desc()),
+        Index("ix_orders_store_date", "store_id", order_date.desc()),
+        Index("ix_orders_status", "status"),
+    )
+    
     # Relationships
     customer = relationship("Customer", back_populates="orders")
     store = relationship("Store", back_populates="orders")
@@ -83,6 +94,11 @@ class OrderItem(Base):
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
     
+    __table_args__ = (
+        Index("ix_items_order", "order_id"),
+        Index("ix_items_product", "product_id"),
+    )
+    
     # Relationships
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
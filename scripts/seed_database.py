@@ -1,16 +1,29 @@
 """Script to seed the database with sample data."""
 
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func, insert, select, text
 from sqlalchemy.orm import Session
 
-from database.connection import db_manager
+from database.connection import DatabaseManager, get_db_manager
 from database.models import Store, Customer, Product, Order, OrderItem
 
 
-def seed_database():
-    """Seed the database with sample retail data."""
-    with db_manager.get_session() as session:
+def seed_database(force: bool = False, db_manager: DatabaseManager = None):
+    """Seed the database with sample retail data.
+    
+    An already populated database is left untouched unless ``force`` is set.
+    Everything runs in one transaction, committed when the block exits.
+    Seeds the application database unless another ``db_manager`` is given.
+    """
+    db_manager = db_manager or get_db_manager()
+    # Only Core inserts run here, so there is nothing to autoflush and no
+    # loaded instances worth expiring when the transaction commits
+    with Session(db_manager.engine, autoflush=False, expire_on_commit=False) as session, session.begin():
+        if not force and session.scalar(select(func.count()).select_from(Order)):
+            print("Database already seeded, skipping.")
+            return
+        
         # Clear existing data
         session.query(OrderItem).delete()
         session.query(Order).delete()
@@ -26,13 +39,10 @@ def seed_database():
             {"name": "Airport Store", "location": "321 Terminal Blvd, Airport", "manager": "Alice Brown", "phone": "555-0104", "email": "airport@retail.com"},
         ]
         
-        stores = []
-        for store_data in stores_data:
-            store = Store(**store_data)
-            session.add(store)
-            stores.append(store)
-        
-        session.flush()
+        # One multi-row INSERT per table; RETURNING hands back the new ids
+        store_ids = session.scalars(
+            insert(Store).returning(Store.id, sort_by_parameter_order=True), stores_data
+        ).all()
         
         # Seed customers
         customers_data = [
@@ -46,13 +56,9 @@ def seed_database():
             {"first_name": "Jessica", "last_name": "Taylor", "email": "jessica.taylor@email.com", "phone": "555-1008", "address": "800 Eighth St"},
         ]
         
-        customers = []
-        for customer_data in customers_data:
-            customer = Customer(**customer_data)
-            session.add(customer)
-            customers.append(customer)
-        
-        session.flush()
+        customer_ids = session.scalars(
+            insert(Customer).returning(Customer.id, sort_by_parameter_order=True), customers_data
+        ).all()
         
         # Seed products
         products_data = [
@@ -68,56 +74,73 @@ def seed_database():
             {"name": "Backpack", "category": "Accessories", "price": 79.99, "description": "Waterproof backpack", "in_stock": True},
         ]
         
-        products = []
-        for product_data in products_data:
-            product = Product(**product_data)
-            session.add(product)
-            products.append(product)
-        
-        session.flush()
+        product_ids = session.scalars(
+            insert(Product).returning(Product.id, sort_by_parameter_order=True), products_data
+        ).all()
+        product_ids = np.asarray(product_ids)
+        product_prices = np.array([product_data["price"] for product_data in products_data])
         
         # Seed orders and order items
-        order_statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
-        
-        for i in range(50):  # Create 50 orders
-            order_date = datetime.utcnow() - timedelta(days=random.randint(1, 365))
-            customer = random.choice(customers)
-            store = random.choice(stores)
-            status = random.choice(order_statuses)
-            
-            order = Order(
-                customer_id=customer.id,
-                store_id=store.id,
-                order_date=order_date,
-                total_amount=0.0,  # Will be calculated
-                status=status
+        order_statuses = np.array(["pending", "processing", "shipped", "delivered", "cancelled"])
+        num_orders = 50
+        
+        # Draw every random field for all orders and items in one batch each
+        rng = np.random.default_rng()
+        customer_idx = rng.integers(0, len(customer_ids), size=num_orders)
+        store_idx = rng.integers(0, len(store_ids), size=num_orders)
+        status_idx = rng.integers(0, len(order_statuses), size=num_orders)
+        days_ago = rng.integers(1, 366, size=num_orders)
+        num_items = rng.integers(1, 6, size=num_orders)  # 1-5 items per order
+        
+        total_items = int(num_items.sum())
+        product_idx = rng.integers(0, len(product_ids), size=total_items)
+        quantities = rng.integers(1, 4, size=total_items)
+        unit_prices = product_prices[product_idx]
+        
+        # Items are laid out order by order; starts marks each order's first item
+        starts = np.concatenate(([0], num_items.cumsum()[:-1]))
+        total_amounts = np.add.reduceat(unit_prices * quantities, starts)
+        order_dates = np.datetime64(datetime.utcnow(), "us") - days_ago.astype("timedelta64[D]")
+        
+        orders_rows = [
+            {
+                "customer_id": customer_id,
+                "store_id": store_id,
+                "order_date": order_date,
+                "total_amount": total_amount,
+                "status": status
+            }
+            for customer_id, store_id, order_date, total_amount, status in zip(
+                np.asarray(customer_ids)[customer_idx].tolist(),
+                np.asarray(store_ids)[store_idx].tolist(),
+                order_dates.tolist(),
+                total_amounts.tolist(),
+                order_statuses[status_idx].tolist()
             )
-            session.add(order)
-            session.flush()
-            
-            # Add 1-5 items per order
-            total_amount = 0.0
-            num_items = random.randint(1, 5)
-            
-            for _ in range(num_items):
-                product = random.choice(products)
-                quantity = random.randint(1, 3)
-                unit_price = product.price
-                
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=product.id,
-                    quantity=quantity,
-                    unit_price=unit_price
-                )
-                session.add(order_item)
-                total_amount += unit_price * quantity
-            
-            order.total_amount = total_amount
-        
-        session.commit()
+        ]
+        
+        order_ids = session.scalars(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True), orders_rows
+        ).all()
+        
+        # One flat row per item, with each order id repeated for its items
+        item_order_ids = np.repeat(np.asarray(order_ids), num_items)
+        order_items_rows = [
+            {"order_id": order_id, "product_id": product_id, "quantity": quantity, "unit_price": unit_price}
+            for order_id, product_id, quantity, unit_price in zip(
+                item_order_ids.tolist(),
+                product_ids[product_idx].tolist(),
+                quantities.tolist(),
+                unit_prices.tolist()
+            )
+        ]
+        session.execute(insert(OrderItem), order_items_rows)
+        
+        # Refresh planner statistics for the new data and indexes
+        session.execute(text("ANALYZE"))
+        
         print("Database seeded successfully!")
 
 
 if __name__ == "__main__":
-    seed_database()
+    seed_database(force=True)
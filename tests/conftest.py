@@ -1,39 +1,86 @@
 """Pytest configuration and fixtures."""
 
 import pytest
+import asyncio
 import os
-import tempfile
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from database.models import Base
 from database.connection import DatabaseManager
+from scripts.seed_database import seed_database
+import agents.sql_executor_agent
+import agents.text_to_sql_agent
+import database.connection
+import scripts.seed_database
+
+
+# The test database is throwaway, so durability can be traded for speed
+TEST_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=10737418240",
+    "PRAGMA busy_timeout=3000",
+)
+
+
+def _apply_test_pragmas(dbapi_connection, connection_record):
+    """Configure a freshly opened test database connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma in TEST_SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs nest inside real
+    # transactions; pysqlite otherwise defers BEGIN until the first write
+    dbapi_connection.isolation_level = None
+
+
+def _begin_test_transaction(connection):
+    """Start the DBAPI transaction as soon as SQLAlchemy begins one."""
+    connection.exec_driver_sql("BEGIN")
 
 
 @pytest.fixture(scope="session")
 def test_database():
     """Create a test database for testing."""
-    # Create temporary database file
-    db_fd, db_path = tempfile.mkstemp(suffix='.db')
-    os.close(db_fd)
-    
-    # Create test database URL
-    test_db_url = f"sqlite:///{db_path}"
+    # Shared-cache in-memory database, visible to every connection in the
+    # process for as long as this engine holds its connection open. Each
+    # xdist worker gets its own, so workers never touch each other's data.
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    test_db_url = f"sqlite+pysqlite:///file:testdb_{worker}?mode=memory&cache=shared&uri=true"
     
     # Create engine and tables
-    engine = create_engine(test_db_url, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        test_db_url,
+        connect_args={"check_same_thread": False, "uri": True},
+        poolclass=StaticPool
+    )
+    event.listen(engine, "connect", _apply_test_pragmas)
+    event.listen(engine, "begin", _begin_test_transaction)
     Base.metadata.create_all(bind=engine)
     
-    yield test_db_url
+    yield engine
     
     # Cleanup
-    os.unlink(db_path)
+    engine.dispose()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_db_manager(test_database):
-    """Create a test database manager."""
-    return DatabaseManager(database_url=test_database)
+    """Create a test database manager sharing the test engine's connection."""
+    return DatabaseManager(engine=test_database)
+
+
+@pytest.fixture(autouse=True)
+def use_test_db_manager(test_db_manager, monkeypatch):
+    """Route get_db_manager() to the test database, never the repo's DB file."""
+    for module in (database.connection, agents.sql_executor_agent,
+                   agents.text_to_sql_agent, scripts.seed_database):
+        monkeypatch.setattr(module, "get_db_manager", lambda: test_db_manager)
 
 
 @pytest.fixture
@@ -43,5 +90,48 @@ def test_session(test_db_manager):
         yield session
 
 
+@pytest.fixture(scope="session")
+def seeded_engine(test_database):
+    """Seed the test database once for the whole test session."""
+    seed_database(force=True, db_manager=DatabaseManager(engine=test_database))
+    return test_database
+
+
+@contextmanager
+def _rolled_back_session(engine):
+    """Session whose writes, commits included, are rolled back on exit."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def seeded_session(seeded_engine):
+    """Session on the seeded database whose writes are rolled back after the test."""
+    with _rolled_back_session(seeded_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def seeded_session_factory(seeded_engine):
+    """Open rolled-back sessions on the seeded database inside a test."""
+    return lambda: _rolled_back_session(seeded_engine)
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on uvloop where it is installed, as the app does."""
+    try:
+        import uvloop
+        return {"uvloop": uvloop.new_event_loop}
+    except ImportError:
+        return {"asyncio": asyncio.new_event_loop}
+
+
 # Configure pytest-asyncio
 pytest_plugins = ('pytest_asyncio',)
@@ -2,21 +2,65 @@
 
 import pytest
 import asyncio
-from unittest.mock import Mock, patch, AsyncMock
+import logging
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+import pandas as pd
 
-from agents.base_agent import AgentState
+from agents.base_agent import AgentState, _log_buffer
 from agents.text_to_sql_agent import TextToSQLAgent
 from agents.sql_validator_agent import SQLValidatorAgent
 from agents.sql_executor_agent import SQLExecutorAgent
 from agents.result_formatter_agent import ResultFormatterAgent
 
 
+CLEAN_SQL_CASES = [
+    ("```sql\nSELECT * FROM stores\n```", "SELECT * FROM stores;"),
+    ("SQL: SELECT * FROM customers", "SELECT * FROM customers;"),
+    ("  SELECT   *   FROM   products  ", "SELECT * FROM products;"),
+    ("SELECT * FROM orders;", "SELECT * FROM orders;")
+]
+
+TABLE_NAME_CASES = [
+    ("SELECT * FROM stores;", ["stores"]),
+    ("SELECT * FROM stores JOIN customers ON stores.id = customers.store_id;", 
+     ["stores", "customers"]),
+    ("SELECT * FROM orders o JOIN order_items oi ON o.id = oi.order_id;", 
+     ["orders", "order_items"])
+]
+
+
+@pytest.fixture(scope="module")
+def text_to_sql_agent():
+    return TextToSQLAgent()
+
+
+@pytest.fixture(scope="module")
+def validator_agent():
+    return SQLValidatorAgent()
+
+
+@pytest.fixture(scope="module")
+def executor_agent():
+    return SQLExecutorAgent()
+
+
+@pytest.fixture(scope="module")
+def formatter_agent():
+    return ResultFormatterAgent()
+
+
 class TestTextToSQLAgent:
     """Test cases for TextToSQLAgent."""
     
     @pytest.fixture
-    def agent(self):
-        return TextToSQLAgent()
+    def agent(self, text_to_sql_agent):
+        return text_to_sql_agent
+    
+    @pytest.fixture(autouse=True)
+    def reset_cache(self, agent):
+        """Keep cached SQL from one test answering the next."""
+        agent.clear_cache()
     
     @pytest.fixture
     def sample_state(self):
@@ -26,9 +70,7 @@ class TestTextToSQLAgent:
     async def test_process_success(self, agent, sample_state):
         """Test successful text-to-SQL conversion."""
         with patch.object(agent.llm, 'ainvoke', new_callable=AsyncMock) as mock_llm:
-            mock_response = Mock()
-            mock_response.content = "SELECT * FROM stores;"
-            mock_llm.return_value = mock_response
+            mock_llm.return_value = SimpleNamespace(content="SELECT * FROM stores;")
             
             result = await agent.process(sample_state)
             
@@ -49,9 +91,7 @@ class TestTextToSQLAgent:
         )
         
         with patch.object(agent.llm, 'ainvoke', new_callable=AsyncMock) as mock_llm:
-            mock_response = Mock()
-            mock_response.content = "SELECT * FROM customers WHERE store_id = 1;"
-            mock_llm.return_value = mock_response
+            mock_llm.return_value = SimpleNamespace(content="SELECT * FROM customers WHERE store_id = 1;")
             
             result = await agent.process(state)
             
@@ -67,26 +107,29 @@ class TestTextToSQLAgent:
             assert result.error_message is not None
             assert "API Error" in result.error_message
     
-    def test_clean_sql_query(self, agent):
-        """Test SQL query cleaning."""
-        test_cases = [
-            ("```sql\nSELECT * FROM stores\n```", "SELECT * FROM stores;"),
-            ("SQL: SELECT * FROM customers", "SELECT * FROM customers;"),
-            ("  SELECT   *   FROM   products  ", "SELECT * FROM products;"),
-            ("SELECT * FROM orders;", "SELECT * FROM orders;")
-        ]
+    @pytest.mark.asyncio
+    async def test_process_uses_cache(self, agent, test_db_manager):
+        """Test that repeated questions are answered from the SQL cache."""
+        schema_info = test_db_manager.get_schema_info()
+        agent._cache[agent._cache_key("show me all stores", schema_info, "")] = "SELECT * FROM stores;"
         
-        for input_query, expected in test_cases:
-            result = agent._clean_sql_query(input_query)
-            assert result == expected
+        result = await agent.process(AgentState(user_query="  Show me ALL stores "))
+        
+        assert result.sql_query == "SELECT * FROM stores;"
+        assert result.error_message is None
+    
+    @pytest.mark.parametrize("input_query,expected", CLEAN_SQL_CASES)
+    def test_clean_sql_query(self, agent, input_query, expected):
+        """Test SQL query cleaning."""
+        assert agent._clean_sql_query(input_query) == expected
 
 
 class TestSQLValidatorAgent:
     """Test cases for SQLValidatorAgent."""
     
     @pytest.fixture
-    def agent(self):
-        return SQLValidatorAgent()
+    def agent(self, validator_agent):
+        return validator_agent
     
     @pytest.mark.asyncio
     async def test_valid_select_query(self, agent):
@@ -100,6 +143,7 @@ class TestSQLValidatorAgent:
         
         assert result.validation_result["is_valid"] is True
         assert result.error_message is None
+        assert result.can_execute is True
     
     @pytest.mark.asyncio
     async def test_invalid_table_name(self, agent):
@@ -126,6 +170,7 @@ class TestSQLValidatorAgent:
         
         assert result.validation_result["is_valid"] is False
         assert "Forbidden keyword" in result.error_message
+        assert result.can_execute is False
     
     @pytest.mark.asyncio
     async def test_non_select_statement(self, agent):
@@ -140,27 +185,61 @@ class TestSQLValidatorAgent:
         assert result.validation_result["is_valid"] is False
         assert "Only SELECT statements are allowed" in result.error_message
     
-    def test_extract_table_names(self, agent):
-        """Test table name extraction."""
-        test_cases = [
-            ("SELECT * FROM stores;", ["stores"]),
-            ("SELECT * FROM stores JOIN customers ON stores.id = customers.store_id;", 
-             ["stores", "customers"]),
-            ("SELECT * FROM orders o JOIN order_items oi ON o.id = oi.order_id;", 
-             ["orders", "order_items"])
+    def test_check_sql_injection(self, agent):
+        """Test injection pattern detection across whitespace variations."""
+        assert agent._check_sql_injection("SELECT * FROM stores WHERE id = 1 OR 1 = 1;")
+        assert agent._check_sql_injection("SELECT * FROM stores WHERE id=1 or(1=1)")
+        assert agent._check_sql_injection("SELECT * FROM stores WHERE id=1 and(1=1)")
+        assert agent._check_sql_injection("SELECT name FROM stores UNION(SELECT email FROM customers)")
+        assert agent._check_sql_injection("SELECT name FROM stores UNION\n  SELECT email FROM customers;")
+        assert agent._check_sql_injection("SELECT * FROM stores WHERE id = 1;") is None
+    
+    @pytest.mark.asyncio
+    async def test_logs_flushed_once_per_process(self, agent, caplog):
+        """Test that buffered info logs are emitted as a single record."""
+        state = AgentState(
+            user_query="Show stores",
+            sql_query="SELECT * FROM stores;"
+        )
+        
+        with caplog.at_level(logging.INFO, logger=agent.logger.name):
+            await agent.process(state)
+        
+        records = [r for r in caplog.records if r.name == agent.logger.name]
+        assert len(records) == 1
+        assert "Validating SQL" in records[0].getMessage()
+        assert "validation passed" in records[0].getMessage()
+        assert _log_buffer.get() is None
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_logs_kept_separate(self, agent, caplog):
+        """Test that concurrent calls on one agent each flush only their own lines."""
+        states = [
+            AgentState(user_query="Show stores", sql_query="SELECT * FROM stores;"),
+            AgentState(user_query="Show customers", sql_query="SELECT * FROM customers;")
         ]
         
-        for query, expected in test_cases:
-            result = agent._extract_table_names(query)
-            assert set(result) == set(expected)
+        with caplog.at_level(logging.INFO, logger=agent.logger.name):
+            await asyncio.gather(*(agent.process(state) for state in states))
+        
+        messages = [r.getMessage() for r in caplog.records if r.name == agent.logger.name]
+        assert len(messages) == 2
+        for message in messages:
+            assert message.count("Validating SQL") == 1
+            assert message.count("validation passed") == 1
+    
+    @pytest.mark.parametrize("query,expected", TABLE_NAME_CASES)
+    def test_extract_table_names(self, agent, query, expected):
+        """Test table name extraction."""
+        assert set(agent._validate_query(query)["tables_used"]) == set(expected)
 
 
 class TestSQLExecutorAgent:
     """Test cases for SQLExecutorAgent."""
     
     @pytest.fixture
-    def agent(self):
-        return SQLExecutorAgent()
+    def agent(self, executor_agent):
+        return executor_agent
     
     @pytest.mark.asyncio
     async def test_execute_valid_query(self, agent):
@@ -172,16 +251,13 @@ class TestSQLExecutorAgent:
         )
         
         with patch('pandas.read_sql_query') as mock_read_sql:
-            mock_df = Mock()
-            mock_df.to_dict.return_value = [{"id": 1, "name": "Test Store"}]
-            mock_df.columns.tolist.return_value = ["id", "name"]
-            mock_df.__len__.return_value = 1
-            mock_read_sql.return_value = mock_df
+            df = pd.DataFrame([{"id": 1, "name": "Test Store"}])
+            mock_read_sql.return_value = (chunk for chunk in [df])
             
             result = await agent.process(state)
             
             assert result.execution_result["success"] is True
-            assert len(result.execution_result["data"]) == 1
+            assert result.execution_result["row_count"] == 1
     
     @pytest.mark.asyncio
     async def test_execute_invalid_query(self, agent):
@@ -210,14 +286,48 @@ class TestSQLExecutorAgent:
             
             assert result.execution_result["success"] is False
             assert "Database connection error" in result.execution_result["error"]
+    
+    @pytest.mark.asyncio
+    async def test_execute_truncates_large_result(self, seeded_engine):
+        """Test that results over max_rows are truncated on the seeded database."""
+        agent = SQLExecutorAgent()
+        agent.max_rows = 10
+        state = AgentState(
+            user_query="Show orders",
+            sql_query="SELECT * FROM orders;",
+            validation_result={"is_valid": True}
+        )
+        
+        result = await agent.process(state)
+        
+        assert result.execution_result["success"] is True
+        assert result.execution_result["truncated"] is True
+        assert result.execution_result["row_count"] == 10
+        assert len(result.execution_result["_df"]) == 10
+    
+    @pytest.mark.asyncio
+    async def test_execute_empty_result(self, agent, seeded_engine):
+        """Test execution of a query that matches no rows."""
+        state = AgentState(
+            user_query="Show missing stores",
+            sql_query="SELECT id, name FROM stores WHERE 1 = 0;",
+            validation_result={"is_valid": True}
+        )
+        
+        result = await agent.process(state)
+        
+        assert result.execution_result["success"] is True
+        assert result.execution_result["truncated"] is False
+        assert result.execution_result["row_count"] == 0
+        assert result.execution_result["columns"] == ["id", "name"]
 
 
 class TestResultFormatterAgent:
     """Test cases for ResultFormatterAgent."""
     
     @pytest.fixture
-    def agent(self):
-        return ResultFormatterAgent()
+    def agent(self, formatter_agent):
+        return formatter_agent
     
     @pytest.mark.asyncio
     async def test_format_success_result(self, agent):
@@ -241,6 +351,25 @@ class TestResultFormatterAgent:
         assert "2 row(s) returned" in result.formatted_result
         assert result.error_message is None
     
+    @pytest.mark.asyncio
+    async def test_format_tiny_result_skips_stats(self, agent):
+        """Test that results of a few rows are formatted without statistics."""
+        state = AgentState(
+            user_query="Show store",
+            execution_result={
+                "success": True,
+                "data": [{"id": 1, "name": "Store 1"}],
+                "columns": ["id", "name"],
+                "row_count": 1
+            }
+        )
+        
+        result = await agent.process(state)
+        
+        assert "Store 1" in result.formatted_result
+        assert "1 row(s) returned" in result.formatted_result
+        assert "Statistics" not in result.formatted_result
+    
     @pytest.mark.asyncio
     async def test_format_error_result(self, agent):
         """Test formatting of error results."""
@@ -286,3 +415,78 @@ class TestResultFormatterAgent:
         
         assert "Store 1" in result
         assert "Store 2" in result
+    
+    @pytest.mark.asyncio
+    async def test_format_dataframe_with_stats(self, agent):
+        """Test formatting an executor DataFrame with numeric and categorical stats."""
+        df = pd.DataFrame({
+            "category": ["Electronics", "Sports", "Electronics", "Furniture", "Sports"],
+            "price": [999.99, 29.99, 199.99, 299.99, 129.99],
+            "quantity": [1, 3, 2, 1, 5]
+        })
+        state = AgentState(
+            user_query="Show order lines",
+            execution_result={
+                "success": True,
+                "columns": df.columns.tolist(),
+                "row_count": len(df),
+                "truncated": False,
+                "_df": df
+            }
+        )
+        
+        result = await agent.process(state)
+        
+        assert "5 row(s) returned" in result.formatted_result
+        assert "📋 **Data:**" in result.formatted_result
+        assert "Furniture" in result.formatted_result
+        assert "📈 **Statistics:**" in result.formatted_result
+        assert "price: avg=331.99, min=29.99, max=999.99" in result.formatted_result
+        assert "quantity: avg=2.40, min=1.00, max=5.00" in result.formatted_result
+        assert "category: 3 unique values" in result.formatted_result
+    
+    @pytest.mark.asyncio
+    async def test_format_tiny_dataframe(self, agent):
+        """Test that a DataFrame of a few rows is formatted without statistics."""
+        df = pd.DataFrame({"id": [1, 2], "name": ["Store 1", "Store 2"]})
+        state = AgentState(
+            user_query="Show stores",
+            execution_result={"success": True, "columns": ["id", "name"], "row_count": 2, "_df": df}
+        )
+        
+        result = await agent.process(state)
+        
+        assert "Store 2" in result.formatted_result
+        assert "Statistics" not in result.formatted_result
+    
+    @pytest.mark.asyncio
+    async def test_format_large_dataframe_sample(self, agent):
+        """Test that results over 20 rows show a 10-row sample and a truncation note."""
+        df = pd.DataFrame({"id": range(1, 26), "amount": [float(i) for i in range(1, 26)]})
+        state = AgentState(
+            user_query="Show orders",
+            execution_result={
+                "success": True,
+                "columns": ["id", "amount"],
+                "row_count": 25,
+                "truncated": True,
+                "_df": df
+            }
+        )
+        
+        result = await agent.process(state)
+        
+        assert "Sample Data (first 10 rows)" in result.formatted_result
+        assert "... and 15 more rows" in result.formatted_result
+        assert "Results truncated to first 1000 rows" in result.formatted_result
+        assert "amount: avg=13.00, min=1.00, max=25.00" in result.formatted_result
+    
+    def test_create_table_wide_fallback(self, agent):
+        """Test that tables over 10 columns fall back to pandas layout."""
+        columns = [f"col{i}" for i in range(12)]
+        data = [{col: i for col in columns} for i in range(4)]
+        
+        result = agent._create_table(data, columns)
+        
+        assert "col0" in result
+        assert "-+-" not in result
@@ -1,5 +1,6 @@
 """Unit tests for context manager."""
 
+import json
 import pytest
 from datetime import datetime, timedelta
 
@@ -51,6 +52,50 @@ class TestContextManager:
         assert context_manager.conversation_history[0].user_query == "Query 2"
         assert context_manager.conversation_history[-1].user_query == "Query 6"
     
+    def test_bulk_add_entries(self, context_manager):
+        """Test that bulk-added entries are trimmed like individually added ones."""
+        entries = [
+            ConversationEntry(
+                timestamp=datetime.utcnow(),
+                user_query=f"Query {i}",
+                sql_query=f"SELECT {i};",
+                success=i % 2 == 0,
+                result_summary=f"Result {i}",
+                token_count=5
+            )
+            for i in range(7)
+        ]
+        
+        context_manager.bulk_add_entries(entries)
+        
+        assert len(context_manager.conversation_history) == 5
+        assert context_manager.total_tokens == 25
+        assert context_manager.conversation_history[0].user_query == "Query 2"
+        assert context_manager.conversation_history[-1].user_query == "Query 6"
+        
+        summary = context_manager.get_context_summary()
+        assert summary["successful_queries"] == 3
+        assert summary["failed_queries"] == 2
+    
+    def test_bulk_add_entries_token_limit(self, context_manager):
+        """Test that the token limit is enforced once after a bulk add."""
+        context_manager.max_tokens = 20
+        
+        context_manager.bulk_add_entries(
+            ConversationEntry(
+                timestamp=datetime.utcnow(),
+                user_query=f"Query {i}",
+                sql_query=None,
+                success=False,
+                result_summary="",
+                token_count=10
+            )
+            for i in range(5)
+        )
+        
+        assert context_manager.total_tokens == 10
+        assert [entry.user_query for entry in context_manager.conversation_history] == ["Query 4"]
+    
     def test_token_limit_maintenance(self, context_manager):
         """Test token limit maintenance."""
         # Set a low max_tokens for testing
@@ -82,6 +127,16 @@ class TestContextManager:
         assert len(successful_queries) == 2
         assert all(q["sql_query"] is not None for q in successful_queries)
     
+    def test_context_for_llm_cache_invalidated(self, context_manager):
+        """Test that the cached LLM context is rebuilt after the history changes."""
+        context_manager.add_entry("Query 1", "SELECT 1;", True, "Success")
+        
+        first = context_manager.get_context_for_llm()
+        assert context_manager.get_context_for_llm() is first
+        
+        context_manager.add_entry("Query 2", "SELECT 2;", True, "Success")
+        assert len(context_manager.get_context_for_llm()["previous_queries"]) == 2
+    
     def test_get_context_summary(self, context_manager):
         """Test getting context summary."""
         context_manager.add_entry("Query 1", "SELECT 1;", True, "Success")
@@ -95,6 +150,17 @@ class TestContextManager:
         assert summary["context_window_size"] == 5
         assert summary["context_window_usage"] == 2
     
+    def test_summary_counts_after_eviction(self, context_manager):
+        """Test that success/failure counts follow evicted entries."""
+        for i in range(7):
+            context_manager.add_entry(f"Query {i}", success=i % 2 == 0)
+        
+        summary = context_manager.get_context_summary()
+        
+        # Entries 2-6 remain: 2, 4 and 6 succeeded
+        assert summary["successful_queries"] == 3
+        assert summary["failed_queries"] == 2
+    
     def test_clear_context(self, context_manager):
         """Test clearing context."""
         context_manager.add_entry("Query 1", "SELECT 1;", True, "Success")
@@ -139,3 +205,13 @@ class TestContextManager:
         assert "Query 1" in history_json
         assert "Query 2" in history_json
         assert "SELECT 1;" in history_json
+    
+    def test_export_history_compact(self, context_manager):
+        """Test compact history export."""
+        context_manager.add_entry("Query 1", "SELECT 1;", True, "Success")
+        
+        history = json.loads(context_manager.export_history(compact=True))
+        
+        assert "\n" not in context_manager.export_history(compact=True)
+        assert history[0]["user_query"] == "Query 1"
+        assert history[0]["success"] is True
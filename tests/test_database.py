@@ -0,0 +1,42 @@
+"""Unit tests for the seeded test database."""
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from database.models import Store, Order, OrderItem
+
+
+class TestSeededDatabase:
+    """Test cases for the shared seeded database fixtures."""
+    
+    def test_seeded_data(self, seeded_session):
+        """Test that the session starts from the seeded sample data."""
+        assert seeded_session.scalar(select(func.count()).select_from(Store)) == 4
+        assert seeded_session.scalar(select(func.count()).select_from(Order)) == 50
+        assert seeded_session.scalar(select(func.count()).select_from(OrderItem)) >= 50
+    
+    def test_writes_rolled_back(self, seeded_session_factory):
+        """Test that a session's writes are discarded, even after a commit."""
+        with seeded_session_factory() as session:
+            session.add(Store(name="Pop-up Store", location="1 Temporary Way", manager="Sam Lee"))
+            session.commit()
+            
+            assert session.scalar(select(func.count()).select_from(Store)) == 5
+        
+        with seeded_session_factory() as session:
+            assert session.scalar(select(func.count()).select_from(Store)) == 4
+    
+    def test_readonly_connection_rejects_writes(self, test_db_manager, seeded_session_factory):
+        """Test that writes fail on a read-only connection but not afterwards."""
+        with test_db_manager.get_readonly_connection() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM stores")).scalar() == 4
+            with pytest.raises(OperationalError):
+                connection.execute(text("DELETE FROM stores"))
+        
+        # The pooled connection is shared, so writes must work again
+        with seeded_session_factory() as session:
+            session.add(Store(name="Pop-up Store", location="1 Temporary Way", manager="Sam Lee"))
+            session.flush()
+            
+            assert session.scalar(select(func.count()).select_from(Store)) == 5
@@ -0,0 +1,114 @@
+"""Unit tests for the agent pipeline."""
+
+import pytest
+import asyncio
+
+from agents.base_agent import AgentState, BaseAgent
+from core.pipeline import AgentPipeline
+
+
+class RecordingAgent(BaseAgent):
+    """Agent that applies a fixed update and records the queries it saw."""
+
+    def __init__(self, name: str, **updates):
+        super().__init__(name)
+        self.updates = updates
+        self.seen = []
+
+    async def process(self, state: AgentState) -> AgentState:
+        self.seen.append(state.user_query)
+        await asyncio.sleep(0)
+        for key, value in self.updates.items():
+            setattr(state, key, value)
+        return state
+
+
+class SlowAgent(RecordingAgent):
+    """Agent that takes a while to process each state."""
+
+    async def process(self, state: AgentState) -> AgentState:
+        await asyncio.sleep(0.2)
+        return await super().process(state)
+
+
+class FailingAgent(BaseAgent):
+    """Agent whose process always raises."""
+
+    async def process(self, state: AgentState) -> AgentState:
+        raise RuntimeError("Stage error")
+
+
+class TestAgentPipeline:
+    """Test cases for AgentPipeline."""
+
+    @pytest.fixture
+    def agents(self):
+        return {
+            "text_to_sql_agent": RecordingAgent("TextToSQL", sql_query="SELECT * FROM stores;"),
+            "validator_agent": RecordingAgent("Validator", validation_result={"is_valid": True}, can_execute=True),
+            "executor_agent": RecordingAgent("Executor", execution_result={"success": True, "row_count": 0}),
+            "formatter_agent": RecordingAgent("Formatter", formatted_result="Query executed successfully"),
+        }
+
+    @pytest.mark.asyncio
+    async def test_submit_runs_all_stages(self, agents):
+        """Test that a submitted query flows through every stage."""
+        async with AgentPipeline(**agents) as pipeline:
+            future = await pipeline.submit("Show stores")
+            state = await future
+
+        assert state.sql_query == "SELECT * FROM stores;"
+        assert state.formatted_result == "Query executed successfully"
+        assert all(agent.seen == ["Show stores"] for agent in agents.values())
+
+    @pytest.mark.asyncio
+    async def test_invalid_query_skips_execution(self, agents):
+        """Test that states failing validation complete after the validator."""
+        agents["validator_agent"] = RecordingAgent(
+            "Validator",
+            validation_result={"is_valid": False},
+            error_message="Forbidden keyword: DROP"
+        )
+
+        async with AgentPipeline(**agents) as pipeline:
+            state = await (await pipeline.submit("Drop table"))
+
+        assert state.error_message == "Forbidden keyword: DROP"
+        assert agents["executor_agent"].seen == []
+        assert agents["formatter_agent"].seen == []
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submissions(self, agents):
+        """Test that several in-flight queries all resolve in order."""
+        queries = [f"Query {i}" for i in range(5)]
+
+        async with AgentPipeline(maxsize=2, **agents) as pipeline:
+            futures = [await pipeline.submit(query) for query in queries]
+            states = await asyncio.gather(*futures)
+
+        assert [state.user_query for state in states] == queries
+        assert agents["formatter_agent"].seen == queries
+
+    @pytest.mark.asyncio
+    async def test_stage_exception_propagates(self, agents):
+        """Test that an agent exception is set on the query's future."""
+        agents["executor_agent"] = FailingAgent("Executor")
+
+        async with AgentPipeline(**agents) as pipeline:
+            future = await pipeline.submit("Show stores")
+            with pytest.raises(RuntimeError, match="Stage error"):
+                await future
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_unfinished_queries(self, agents):
+        """Test that stopping resolves in-flight and queued queries as cancelled."""
+        agents["text_to_sql_agent"] = SlowAgent("TextToSQL", sql_query="SELECT * FROM stores;")
+
+        async with AgentPipeline(**agents) as pipeline:
+            in_flight = await pipeline.submit("Show stores")
+            await asyncio.sleep(0)
+            queued = await pipeline.submit("Show customers")
+
+        for future in (in_flight, queued):
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(future, timeout=1)
@@ -2,12 +2,26 @@
 
 import pytest
 import asyncio
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import Mock, patch
 
 from core.workflow import TextToSQLWorkflow
+from core.context_manager import ContextManager
 from agents.base_agent import AgentState
 
 
+def returning(value=None):
+    """Build a cheap async stand-in for an agent's process that counts its calls."""
+    async def stub(*args, **kwargs):
+        stub.call_count += 1
+        stub.call_args = (args, kwargs)
+        return stub.return_value
+    
+    stub.return_value = value
+    stub.call_count = 0
+    stub.call_args = None
+    return stub
+
+
 class TestTextToSQLWorkflow:
     """Test cases for TextToSQLWorkflow."""
     
@@ -15,84 +29,84 @@ class TestTextToSQLWorkflow:
     def workflow(self):
         return TextToSQLWorkflow()
     
+    @pytest.fixture
+    def stub_agents(self, workflow, monkeypatch):
+        """Replace every agent's process with a returning() stub, keyed by agent name."""
+        stubs = {}
+        for name in ("text_to_sql_agent", "validator_agent", "executor_agent", "formatter_agent"):
+            stubs[name] = returning()
+            monkeypatch.setattr(getattr(workflow, name), "process", stubs[name])
+        return stubs
+    
     @pytest.mark.asyncio
-    async def test_successful_workflow(self, workflow):
+    async def test_successful_workflow(self, workflow, stub_agents):
         """Test complete successful workflow."""
-        with patch.object(workflow.text_to_sql_agent, 'process', new_callable=AsyncMock) as mock_text_to_sql, \
-             patch.object(workflow.validator_agent, 'process', new_callable=AsyncMock) as mock_validator, \
-             patch.object(workflow.executor_agent, 'process', new_callable=AsyncMock) as mock_executor, \
-             patch.object(workflow.formatter_agent, 'process', new_callable=AsyncMock) as mock_formatter:
-            
-            # Mock agent responses
-            mock_text_to_sql.return_value = AgentState(
-                user_query="Show stores",
-                sql_query="SELECT * FROM stores;"
-            )
-            
-            mock_validator.return_value = AgentState(
-                user_query="Show stores",
-                sql_query="SELECT * FROM stores;",
-                validation_result={"is_valid": True}
-            )
-            
-            mock_executor.return_value = AgentState(
-                user_query="Show stores",
-                sql_query="SELECT * FROM stores;",
-                validation_result={"is_valid": True},
-                execution_result={"success": True, "data": [], "row_count": 0}
-            )
-            
-            mock_formatter.return_value = AgentState(
-                user_query="Show stores",
-                sql_query="SELECT * FROM stores;",
-                validation_result={"is_valid": True},
-                execution_result={"success": True, "data": [], "row_count": 0},
-                formatted_result="Query executed successfully"
-            )
-            
-            result = await workflow.process_query("Show stores")
-            
-            assert result["success"] is True
-            assert result["sql_query"] == "SELECT * FROM stores;"
-            assert result["formatted_result"] == "Query executed successfully"
-            
-            # Verify all agents were called
-            mock_text_to_sql.assert_called_once()
-            mock_validator.assert_called_once()
-            mock_executor.assert_called_once()
-            mock_formatter.assert_called_once()
+        # Mock agent responses
+        stub_agents["text_to_sql_agent"].return_value = AgentState(
+            user_query="Show stores",
+            sql_query="SELECT * FROM stores;"
+        )
+        
+        stub_agents["validator_agent"].return_value = AgentState(
+            user_query="Show stores",
+            sql_query="SELECT * FROM stores;",
+            validation_result={"is_valid": True},
+            can_execute=True
+        )
+        
+        stub_agents["executor_agent"].return_value = AgentState(
+            user_query="Show stores",
+            sql_query="SELECT * FROM stores;",
+            validation_result={"is_valid": True},
+            execution_result={"success": True, "data": [], "row_count": 0}
+        )
+        
+        stub_agents["formatter_agent"].return_value = AgentState(
+            user_query="Show stores",
+            sql_query="SELECT * FROM stores;",
+            validation_result={"is_valid": True},
+            execution_result={"success": True, "data": [], "row_count": 0},
+            formatted_result="Query executed successfully"
+        )
+        
+        result = await workflow.process_query("Show stores")
+        
+        assert result["success"] is True
+        assert result["sql_query"] == "SELECT * FROM stores;"
+        assert result["formatted_result"] == "Query executed successfully"
+        
+        # Verify all agents were called
+        assert stub_agents["text_to_sql_agent"].call_count == 1
+        assert stub_agents["validator_agent"].call_count == 1
+        assert stub_agents["executor_agent"].call_count == 1
+        assert stub_agents["formatter_agent"].call_count == 1
     
     @pytest.mark.asyncio
-    async def test_validation_failure_workflow(self, workflow):
+    async def test_validation_failure_workflow(self, workflow, stub_agents):
         """Test workflow when validation fails."""
-        with patch.object(workflow.text_to_sql_agent, 'process', new_callable=AsyncMock) as mock_text_to_sql, \
-             patch.object(workflow.validator_agent, 'process', new_callable=AsyncMock) as mock_validator, \
-             patch.object(workflow.executor_agent, 'process', new_callable=AsyncMock) as mock_executor, \
-             patch.object(workflow.formatter_agent, 'process', new_callable=AsyncMock) as mock_formatter:
-            
-            # Mock agent responses
-            mock_text_to_sql.return_value = AgentState(
-                user_query="Drop table",
-                sql_query="DROP TABLE stores;"
-            )
-            
-            mock_validator.return_value = AgentState(
-                user_query="Drop table",
-                sql_query="DROP TABLE stores;",
-                validation_result={"is_valid": False},
-                error_message="Forbidden keyword: DROP"
-            )
-            
-            result = await workflow.process_query("Drop table")
-            
-            assert result["success"] is False
-            assert "DROP" in result["error_message"]
-            
-            # Verify executor and formatter were not called
-            mock_text_to_sql.assert_called_once()
-            mock_validator.assert_called_once()
-            mock_executor.assert_not_called()
-            mock_formatter.assert_not_called()
+        # Mock agent responses
+        stub_agents["text_to_sql_agent"].return_value = AgentState(
+            user_query="Drop table",
+            sql_query="DROP TABLE stores;"
+        )
+        
+        stub_agents["validator_agent"].return_value = AgentState(
+            user_query="Drop table",
+            sql_query="DROP TABLE stores;",
+            validation_result={"is_valid": False},
+            error_message="Forbidden keyword: DROP"
+        )
+        
+        result = await workflow.process_query("Drop table")
+        
+        assert result["success"] is False
+        assert "DROP" in result["error_message"]
+        
+        # Verify executor and formatter were not called
+        assert stub_agents["text_to_sql_agent"].call_count == 1
+        assert stub_agents["validator_agent"].call_count == 1
+        assert stub_agents["executor_agent"].call_count == 0
+        assert stub_agents["formatter_agent"].call_count == 0
     
     @pytest.mark.asyncio
     async def test_workflow_exception_handling(self, workflow):
@@ -104,12 +118,44 @@ class TestTextToSQLWorkflow:
             assert "Workflow error" in result["error_message"]
             assert "Agent error" in result["error_message"]
     
+    @pytest.mark.asyncio
+    async def test_stream_query_stages(self, workflow, stub_agents):
+        """Test that stream_query reports each node before completing."""
+        stub_agents["text_to_sql_agent"].return_value = AgentState(
+            user_query="Drop table",
+            sql_query="DROP TABLE stores;"
+        )
+        stub_agents["validator_agent"].return_value = AgentState(
+            user_query="Drop table",
+            sql_query="DROP TABLE stores;",
+            validation_result={"is_valid": False},
+            error_message="Forbidden keyword: DROP"
+        )
+        
+        updates = [update async for update in workflow.stream_query("Drop table")]
+        
+        assert [update["stage"] for update in updates] == ["sql_generated", "validated", "complete"]
+        assert updates[0]["sql_query"] == "DROP TABLE stores;"
+        assert "DROP" in updates[-1]["error_message"]
+    
+    @pytest.mark.asyncio
+    async def test_injected_context_manager(self, workflow):
+        """Test that a caller-supplied context manager records the query."""
+        session_context = ContextManager()
+        
+        with patch.object(workflow.text_to_sql_agent, 'process', side_effect=Exception("Agent error")):
+            await workflow.process_query("Test query", session_context)
+        
+        assert len(session_context.conversation_history) == 1
+        assert len(workflow.context_manager.conversation_history) == 0
+    
     def test_should_execute_decision(self, workflow):
         """Test execution decision logic."""
         # Valid state should execute
         valid_state = AgentState(
             user_query="Show stores",
-            validation_result={"is_valid": True}
+            validation_result={"is_valid": True},
+            can_execute=True
         )
         assert workflow._should_execute(valid_state) == "execute"
         
@@ -129,6 +175,10 @@ class TestTextToSQLWorkflow:
         )
         assert workflow._should_execute(error_state) == "end"
     
+    def test_compiled_graph_shared(self, workflow):
+        """Test that workflow instances reuse one compiled graph."""
+        assert TextToSQLWorkflow().workflow is workflow.workflow
+    
     def test_context_manager_integration(self, workflow):
         """Test context manager integration."""
         context_manager = workflow.get_context_manager()
@@ -138,4 +188,4 @@ class TestTextToSQLWorkflow:
         
         # Should be properly initialized
         assert context_manager.max_entries > 0
-        assert context_manager.conversation_history == []
+        assert len(context_manager.conversation_history) == 0